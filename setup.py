@@ -29,10 +29,17 @@ setup_requirements = [
 test_requirements = [
     # fmt: off
     "pytest>=3",
+    "pytest-benchmark",
     "pytest-cov",
     # fmt: on
 ]
 
+arrow_requirements = [
+    # fmt: off
+    "pyarrow",
+    # fmt: on
+]
+
 doc_requirements = [
     # fmt: off
     "sphinx",
@@ -67,6 +74,9 @@ setup_kwargs = dict(
     description="NiFi FlowFile Serializer",
     # fmt: off
     entry_points={
+        "console_scripts": [
+            "flowfile=nifi.flowfile.cli:flowfile",
+        ],
         "nifi.cli": [
             "flowfile=nifi.flowfile.cli:flowfile",
         ],
@@ -86,6 +96,7 @@ setup_kwargs = dict(
     tests_require=test_requirements,
     extras_require={
         # fmt: off
+        "arrow": arrow_requirements,
         "test": test_requirements,
         "doc": doc_requirements
         # fmt: on
@@ -1,6 +1,28 @@
 """Top-level package for NiFi's FlowFile Format."""
+import sys
+from importlib import import_module
+
 from ._version import version as __version__  # noqa: F401
-from .stream import open
-from .flowfile import FlowFile
 
 __all__ = ["open", "FlowFile"]
+
+# Submodules are only imported on first access, keeping `import nifi.flowfile`
+# and the CLI startup fast.
+_lazy_attributes = {"open": ".stream", "FlowFile": ".flowfile"}
+
+
+def __getattr__(name):
+    if name not in _lazy_attributes:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(import_module(_lazy_attributes[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_attributes))
+
+
+if sys.version_info < (3, 7):  # PEP 562 is not available
+    from .stream import open  # noqa: F401,E402
+    from .flowfile import FlowFile  # noqa: F401,E402
@@ -0,0 +1,226 @@
+"""Columnar conversion between FlowFile Stream v3 and Apache Arrow.
+
+Each attribute key becomes a dictionary-encoded string column and the content
+becomes either a binary column or a pair of offset/length columns pointing into
+the FlowFile Stream v3 file. Requires `pyarrow`, e.g. `pip install
+nifi.flowfile[arrow]`.
+"""
+import io
+from typing import Iterable, Iterator, List
+
+from .flowfile import FlowFile
+from .stream import FlowFileStreamWriter, MAGIC_HEADER, read_attributes, read_long
+
+DEFAULT_BATCH_SIZE = 65536
+CONTENT_COLUMN = "ff.content"
+OFFSET_COLUMN = "ff.content.offset"
+LENGTH_COLUMN = "ff.content.length"
+CONTENT_MODES = ("binary", "offsets", "none")
+EXPORT_FORMATS = ("parquet", "arrow")
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:  # pragma: no cover
+        raise ImportError(
+            "nifi.flowfile.arrow requires pyarrow: pip install nifi.flowfile[arrow]"
+        )
+    return pyarrow
+
+
+def _skip(fp, length):
+    if fp.seekable():
+        fp.seek(length, io.SEEK_CUR)
+    else:
+        while length > 0:
+            length -= len(fp.read(min(length, io.DEFAULT_BUFFER_SIZE)))
+
+
+def _to_record_batch(pa, rows, contents, offsets, lengths, keys, content):
+    if keys is None:
+        keys = {}
+        for attributes in rows:
+            keys.update(dict.fromkeys(attributes))
+
+    arrays, names = [], []
+    for key in keys:
+        column = pa.array([attributes.get(key) for attributes in rows], pa.string())
+        arrays.append(column.dictionary_encode())
+        names.append(key)
+    if content == "binary":
+        arrays.append(pa.array(contents, pa.large_binary()))
+        names.append(CONTENT_COLUMN)
+    elif content == "offsets":
+        arrays.append(pa.array(offsets, pa.int64()))
+        names.append(OFFSET_COLUMN)
+        arrays.append(pa.array(lengths, pa.int64()))
+        names.append(LENGTH_COLUMN)
+    return pa.RecordBatch.from_arrays(arrays, names=names)
+
+
+def _decode_dictionaries(pa, batch):
+    arrays = [
+        column.dictionary_decode() if pa.types.is_dictionary(column.type) else column
+        for column in batch.columns
+    ]
+    return pa.RecordBatch.from_arrays(arrays, names=batch.schema.names)
+
+
+def iter_record_batches(
+    fp, batch_size=DEFAULT_BATCH_SIZE, content="binary", keys: List[str] = None
+):
+    """
+    Decodes a FlowFile Stream v3 file into Arrow record batches of `batch_size` rows.
+
+    `content` is one of "binary" (a content column), "offsets" (offset and length
+    columns, the content is skipped, `fp` should be seekable) or "none".
+    Without `keys` every attribute key of a batch gets a column, so consecutive
+    batches may have different schemas.
+    """
+    if content not in CONTENT_MODES:
+        raise ValueError("'content' must be one of {}".format(", ".join(CONTENT_MODES)))
+    pa = _import_pyarrow()
+
+    rows, contents, offsets, lengths = [], [], [], []
+    while True:
+        header = fp.read(len(MAGIC_HEADER))
+        if header == b"":
+            break
+        if header != MAGIC_HEADER:
+            raise IOError("Not in FlowFile-v3 format")
+
+        rows.append(read_attributes(fp))
+        length = read_long(fp)
+        if content == "binary":
+            contents.append(fp.read(length))
+        else:
+            if content == "offsets":
+                offsets.append(fp.tell())
+                lengths.append(length)
+            _skip(fp, length)
+
+        if len(rows) == batch_size:
+            yield _to_record_batch(pa, rows, contents, offsets, lengths, keys, content)
+            rows, contents, offsets, lengths = [], [], [], []
+
+    if rows:
+        yield _to_record_batch(pa, rows, contents, offsets, lengths, keys, content)
+
+
+def scan_keys(fp) -> List[str]:
+    """
+    Every attribute key of a FlowFile Stream v3 file, in order of first appearance.
+    The content is skipped, so only the attributes of a record are held at a time.
+    """
+    keys = {}
+    while True:
+        header = fp.read(len(MAGIC_HEADER))
+        if header == b"":
+            break
+        if header != MAGIC_HEADER:
+            raise IOError("Not in FlowFile-v3 format")
+        keys.update(dict.fromkeys(read_attributes(fp)))
+        _skip(fp, read_long(fp))
+    return list(keys)
+
+
+def read_table(fp, batch_size=DEFAULT_BATCH_SIZE, content="binary", keys=None):
+    """
+    Decodes a FlowFile Stream v3 file into a single Arrow table, attribute columns
+    missing from some batches are filled with nulls.
+    """
+    pa = _import_pyarrow()
+    tables = [
+        pa.Table.from_batches([batch])
+        for batch in iter_record_batches(fp, batch_size, content, keys)
+    ]
+    if not tables:
+        return pa.table({})
+    try:
+        return pa.concat_tables(tables, promote_options="default")
+    except TypeError:  # pragma: no cover, pyarrow < 14
+        return pa.concat_tables(tables, promote=True)
+
+
+def iter_flowfiles(batches: Iterable) -> Iterator[FlowFile]:
+    """
+    Converts Arrow record batches (or a table) back into FlowFiles. Null attribute
+    values are dropped and the content is read from the content column, if any.
+    """
+    if hasattr(batches, "to_batches"):
+        batches = batches.to_batches()
+
+    reserved = {CONTENT_COLUMN, OFFSET_COLUMN, LENGTH_COLUMN}
+    for batch in batches:
+        names = [name for name in batch.schema.names if name not in reserved]
+        columns = [batch.column(name).to_pylist() for name in names]
+        if CONTENT_COLUMN in batch.schema.names:
+            contents = batch.column(CONTENT_COLUMN).to_pylist()
+        else:
+            contents = [b""] * batch.num_rows
+
+        for i, content in enumerate(contents):
+            attributes = {
+                name: column[i]
+                for name, column in zip(names, columns)
+                if column[i] is not None
+            }
+            yield FlowFile(attributes, content or b"")
+
+
+def write_table(fp, batches: Iterable):
+    """Encodes Arrow record batches (or a table) as a FlowFile Stream v3 file."""
+    FlowFileStreamWriter(fp).write_all(iter_flowfiles(batches))
+
+
+def export(
+    fp,
+    path,
+    format="parquet",
+    batch_size=DEFAULT_BATCH_SIZE,
+    content="binary",
+    keys=None,
+) -> int:
+    """
+    Exports a FlowFile Stream v3 file to a Parquet or Arrow IPC file, returns the
+    number of rows written.
+
+    Without `keys`, a seekable `fp` is read twice: first to collect every attribute
+    key with `scan_keys`, then to stream the batches with a column per key. Any
+    other `fp` is decoded into a table in memory first. The IPC file format cannot
+    change dictionaries between batches, so streamed Arrow files have plain string
+    columns.
+    """
+    if format not in EXPORT_FORMATS:
+        raise ValueError("'format' must be one of {}".format(", ".join(EXPORT_FORMATS)))
+    pa = _import_pyarrow()
+
+    if keys is None and fp.seekable():
+        start = fp.tell()
+        keys = scan_keys(fp)
+        fp.seek(start)
+
+    if keys is None:
+        batches = read_table(fp, batch_size, content).unify_dictionaries().to_batches()
+    else:
+        batches = iter_record_batches(fp, batch_size, content, keys)
+        if format == "arrow":
+            batches = (_decode_dictionaries(pa, batch) for batch in batches)
+
+    writer, rows = None, 0
+    try:
+        for batch in batches:
+            if writer is None:
+                if format == "parquet":
+                    import pyarrow.parquet
+
+                    writer = pyarrow.parquet.ParquetWriter(path, batch.schema)
+                else:
+                    writer = pa.ipc.new_file(path, batch.schema)
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
@@ -2,9 +2,10 @@
 import os
 import click
 
-import configparser
+# The command implementations import their dependencies lazily, so that the
+# CLI starts fast.
 
-from .stream import FlowFileStreamReader
+ATTRIBUTES_SUFFIX = ".ffa.ini"
 
 
 @click.group()
@@ -14,8 +15,69 @@ def flowfile():
 
 
 @flowfile.command()
-def pack():
-    """packs content."""
+@click.option(
+    "-C",
+    "--directory",
+    metavar="DIR",
+    help="change to directory DIR",
+    default=".",
+    show_default=True,
+    type=click.Path(exists=True, file_okay=False, resolve_path=True),
+)
+@click.option(
+    "--dedup",
+    is_flag=True,
+    help="skip FlowFiles whose content has already been packed",
+)
+@click.option("-v", "--verbose", count=True)
+@click.argument("file", type=click.File(mode="wb"))
+def pack(directory, dedup, verbose, file):
+    """packs content.
+
+    \b
+    FILE: Path to FlowFile Stream v3 file.
+    """
+    import configparser
+    from .dedup import ContentDigestIndex
+    from .flowfile import FlowFile
+    from .stream import FlowFileStreamWriter
+
+    # FILE may be inside DIR, it must not pack itself
+    name = getattr(file, "name", None)
+    output = os.path.realpath(name) if isinstance(name, str) else None
+
+    writer = FlowFileStreamWriter(file, dedup=ContentDigestIndex() if dedup else None)
+    for dirpath, dirnames, filenames in os.walk(directory):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.endswith(ATTRIBUTES_SUFFIX):
+                continue
+            abs_filename = os.path.join(dirpath, filename)
+            if output is not None and os.path.realpath(abs_filename) == output:
+                continue
+            if verbose:
+                click.echo("{}".format(abs_filename), err=True)
+
+            attributes = {
+                "path": os.path.relpath(dirpath, directory) + "/",
+                "filename": filename,
+            }
+            if os.path.exists(abs_filename + ATTRIBUTES_SUFFIX):
+                config = configparser.ConfigParser(interpolation=None)
+                config.optionxform = str
+                config.read(abs_filename + ATTRIBUTES_SUFFIX)
+                attributes = dict(config["attributes"])
+
+            with open(abs_filename, mode="rb") as f:
+                writer.write(FlowFile(attributes, f.read()))
+
+    if writer.dedup is not None and verbose:
+        click.echo(
+            "{records} records, {duplicates} duplicates, "
+            "{bytes_saved} bytes saved".format(**writer.dedup.stats()),
+            err=True,
+        )
+
     return 0
 
 
@@ -37,8 +99,11 @@ def unpack(directory, verbose, file):
     \b
     FILE: Path to FlowFile Stream v3 file.
     """
+    import configparser
+    from .stream import FlowFileStreamReader
 
-    for attributes, data in FlowFileStreamReader(file):
+    for ff in FlowFileStreamReader(file):
+        attributes, data = ff.get_attributes(), ff.get_content()
         path = os.path.abspath(os.path.join(directory, attributes["path"]))
         os.makedirs(path, exist_ok=True)
 
@@ -49,7 +114,7 @@ def unpack(directory, verbose, file):
                 click.echo("{}".format(f.name))
             f.write(data)
 
-        with open(abs_filename + ".ffa.ini", mode="wt") as f:
+        with open(abs_filename + ATTRIBUTES_SUFFIX, mode="wt") as f:
             if verbose:
                 click.echo("{}".format(f.name))
             config = configparser.ConfigParser()
@@ -57,3 +122,121 @@ def unpack(directory, verbose, file):
             config.write(f)
 
     return 0
+
+
+@flowfile.command()
+@click.option(
+    "-f",
+    "--format",
+    "format_",
+    type=click.Choice(["parquet", "arrow"]),
+    default="parquet",
+    show_default=True,
+)
+@click.option(
+    "--content",
+    type=click.Choice(["binary", "offsets", "none"]),
+    default="binary",
+    show_default=True,
+    help="export the content as a binary column, as offset/length columns or not at all",
+)
+@click.option(
+    "-a",
+    "--attribute",
+    "attributes",
+    metavar="KEY",
+    multiple=True,
+    help="export only attribute KEY (repeatable)",
+)
+@click.option("--batch-size", default=65536, show_default=True)
+@click.option("-v", "--verbose", count=True)
+@click.argument("file", type=click.File(mode="rb"))
+@click.argument("output", type=click.Path(dir_okay=False, writable=True))
+def export(format_, content, attributes, batch_size, verbose, file, output):
+    """exports attributes and content to a columnar file.
+
+    \b
+    FILE: Path to FlowFile Stream v3 file.
+    OUTPUT: Path to the Parquet or Arrow IPC file.
+    """
+    from . import arrow
+
+    rows = arrow.export(
+        file,
+        output,
+        format=format_,
+        batch_size=batch_size,
+        content=content,
+        keys=list(attributes) or None,
+    )
+    if verbose:
+        click.echo("{} rows exported to {}".format(rows, output), err=True)
+
+    return 0
+
+
+@flowfile.command()
+@click.option("--host", default="0.0.0.0", show_default=True)
+@click.option("-p", "--port", default=8081, show_default=True)
+@click.option("--path", default="/contentListener", show_default=True)
+@click.option(
+    "--queue", metavar="QUEUE", help="send the FlowFiles to the NiFi SQS queue QUEUE"
+)
+@click.option(
+    "--input-port", metavar="PORT_ID", help="input port id of the FlowFiles sent"
+)
+@click.option("-v", "--verbose", count=True)
+@click.argument("file", type=click.File(mode="ab"), required=False)
+def serve(host, port, path, queue, input_port, verbose, file):
+    """receives FlowFiles over HTTP, like NiFi's ListenHTTP.
+
+    \b
+    FILE: Path to FlowFile Stream v3 file the FlowFiles are appended to.
+    """
+    import asyncio
+    from .server import ListenHTTPServer
+    from .stream import FlowFileStreamWriter
+
+    if (file is None) == (queue is None):
+        raise click.UsageError("Either FILE or --queue is required")
+
+    if queue is not None:
+        if input_port is None:
+            raise click.UsageError("--input-port is required with --queue")
+        from functools import partial
+        from sqs_workers import SQSEnv
+        from nifi.sqs_workers import NiFiQueue
+
+        handler = partial(SQSEnv().queue(queue, NiFiQueue).add_flowfile, input_port)
+    else:
+        writer = FlowFileStreamWriter(file)
+
+        async def handler(ff):
+            writer.write(ff)
+            file.flush()
+
+    server = ListenHTTPServer(handler, host=host, port=port, path=path)
+    loop = asyncio.new_event_loop()
+    if file is not None:
+        from .stream import METRICS_FLUSH_INTERVAL
+
+        # The writer is never closed while serving, report its metrics periodically
+        def flush_metrics():
+            writer.flush_metrics()
+            loop.call_later(METRICS_FLUSH_INTERVAL, flush_metrics)
+
+        loop.call_soon(flush_metrics)
+    try:
+        loop.run_until_complete(server.start())
+        if verbose:
+            click.echo("Listening on http://{}:{}{}".format(host, port, path), err=True)
+        loop.run_until_complete(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        loop.close()
+        if file is not None:
+            writer.close()
+
+    return 0
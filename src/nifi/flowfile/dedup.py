@@ -0,0 +1,77 @@
+"""Content-addressed deduplication for NiFi's FlowFile Stream v3"""
+import hashlib
+from collections import OrderedDict
+
+from .repository import DEFAULT_CHUNK_SIZE
+
+DEFAULT_MAXSIZE = 65536
+
+
+class ContentDigestIndex(object):
+    """
+    Bounded LRU index of the content digests seen by a writer.
+
+    Once `maxsize` digests are held the least recently seen digest is evicted,
+    so memory stays constant no matter how many FlowFiles are written.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, algorithm="sha256"):
+        if maxsize < 1:
+            raise ValueError("'maxsize' must be a positive integer")
+        self.maxsize = maxsize
+        self.algorithm = algorithm
+        self._digests = OrderedDict()
+
+        self.records = 0
+        self.duplicates = 0
+        self.bytes_written = 0
+        self.bytes_saved = 0
+
+    def __len__(self):
+        return len(self._digests)
+
+    def __contains__(self, digest):
+        return digest in self._digests
+
+    def digest(self, chunks) -> bytes:
+        h = hashlib.new(self.algorithm)
+        for chunk in chunks:
+            h.update(chunk)
+        return h.digest()
+
+    def add(self, content: bytes) -> bool:
+        """
+        Records `content` in the index, returns True if it had already been seen.
+        """
+        return self._add(self.digest((content,)), len(content))
+
+    def add_flowfile(self, flowfile) -> bool:
+        """
+        Records the content of `flowfile`, hashing it one chunk at a time.
+        """
+        return self._add(
+            self.digest(flowfile.iter_content(DEFAULT_CHUNK_SIZE)),
+            flowfile.get_content_size(),
+        )
+
+    def _add(self, digest, length) -> bool:
+        self.records += 1
+        if digest in self._digests:
+            self._digests.move_to_end(digest)
+            self.duplicates += 1
+            self.bytes_saved += length
+            return True
+
+        self._digests[digest] = None
+        if len(self._digests) > self.maxsize:
+            self._digests.popitem(last=False)
+        self.bytes_written += length
+        return False
+
+    def stats(self):
+        return {
+            "records": self.records,
+            "duplicates": self.duplicates,
+            "bytes_written": self.bytes_written,
+            "bytes_saved": self.bytes_saved,
+        }
@@ -1,9 +1,11 @@
 import attr
 
 from copy import deepcopy
-from typing import Dict
+from typing import Dict, Iterator
 
+from . import provenance
 from .attributes import CoreAttributes
+from .repository import ContentClaim, DEFAULT_CHUNK_SIZE, InMemoryContent
 
 
 @attr.s
@@ -27,7 +29,7 @@ class FlowFile(object):
         new_attributes = deepcopy(self._attributes)
         new_attributes.update(kwargs)
         new_attributes.update(CoreAttributes.default_attributes())
-        return FlowFile(new_attributes, self._content)
+        return self._derive(new_attributes)
 
     def del_attribute(self, key):
         return self.del_all_attributes(keys={key})
@@ -37,7 +39,29 @@ class FlowFile(object):
         for key in keys & new_attributes.keys():
             del new_attributes[key]
         new_attributes.update(CoreAttributes.default_attributes())
-        return FlowFile(new_attributes, self._content)
+        return self._derive(new_attributes)
+
+    def _derive(self, new_attributes):
+        rv = FlowFile(new_attributes, self._content)
+        recorder = provenance.recorder
+        if recorder is not None:
+            recorder.record(
+                provenance.ProvenanceEventType.ATTRIBUTES_MODIFIED,
+                provenance.flowfile_uuid(rv),
+                (provenance.flowfile_uuid(self),),
+            )
+        return rv
 
     def get_content(self) -> bytes:
+        if isinstance(self._content, (ContentClaim, InMemoryContent)):
+            return self._content.read()
         return self._content
+
+    def get_content_size(self) -> int:
+        return len(self._content)
+
+    def iter_content(self, chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        if isinstance(self._content, (ContentClaim, InMemoryContent)):
+            yield from self._content.iter_chunks(chunk_size)
+        elif self._content:
+            yield self._content
@@ -0,0 +1,218 @@
+"""Write-ahead journal of FlowFile Stream v3 records"""
+import io
+import os
+import threading
+from typing import List, Tuple
+
+from .flowfile import FlowFile
+from .stream import (
+    MAGIC_HEADER,
+    FlowFileStreamWriter,
+    read_attributes,
+    read_field_length,
+    read_long,
+)
+
+DEFAULT_SEGMENT_SIZE = 256 * 1024 * 1024
+CHECKPOINT_FILENAME = "checkpoint"
+SEGMENT_SUFFIX = ".ff3"
+
+
+def read_record(fp) -> FlowFile:
+    if fp.read(len(MAGIC_HEADER)) != MAGIC_HEADER:
+        raise IOError("Not in FlowFile-v3 format")
+    attributes = read_attributes(fp)
+    content = fp.read(read_long(fp))
+    return FlowFile(attributes, content)
+
+
+def skip_record(fp, size: int):
+    """
+    Skips over the record starting at the current position of `fp`, returns its
+    end offset or None when the record is truncated.
+    """
+    if fp.read(len(MAGIC_HEADER)) != MAGIC_HEADER:
+        return None
+    if fp.tell() + 2 > size:
+        return None
+    for i in range(2 * read_field_length(fp)):
+        if fp.tell() + 2 > size:
+            return None
+        fp.seek(read_field_length(fp), io.SEEK_CUR)
+    if fp.tell() + 8 > size:
+        return None
+    end = fp.tell() + 8
+    end += read_long(fp)
+    if end > size:
+        return None
+    fp.seek(end)
+    return end
+
+
+class FlowFileJournal(object):
+    """
+    Append-only, crash-safe journal of FlowFiles.
+
+    Records are appended to segment files in FlowFile Stream v3 format. `commit`
+    makes every record appended so far durable with a single fsync, concurrent
+    committers are batched into the fsync already in flight (group commit).
+
+    Committed records are consumed with `read_batch` and acknowledged with
+    `checkpoint`, which also removes fully consumed segments. On open the journal
+    resumes from the last checkpoint and drops any partially written record.
+    """
+
+    def __init__(self, directory, segment_size=DEFAULT_SEGMENT_SIZE, sync=True):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.sync = sync
+        os.makedirs(directory, exist_ok=True)
+
+        self._write_lock = threading.Lock()
+        self._commit_lock = threading.Lock()
+        self._appended = 0
+        self._committed = 0
+
+        self._checkpoint = self._read_checkpoint()
+        self._read_position = self._checkpoint
+        self._recover()
+
+    def _segment_path(self, index: int) -> str:
+        return os.path.join(self.directory, "{:012d}{}".format(index, SEGMENT_SUFFIX))
+
+    def _segments(self) -> List[int]:
+        return sorted(
+            int(name[: -len(SEGMENT_SUFFIX)])
+            for name in os.listdir(self.directory)
+            if name.endswith(SEGMENT_SUFFIX)
+        )
+
+    def _read_checkpoint(self) -> Tuple[int, int]:
+        try:
+            with io.open(os.path.join(self.directory, CHECKPOINT_FILENAME)) as f:
+                segment, offset = f.read().split()
+                return int(segment), int(offset)
+        except FileNotFoundError:
+            segments = self._segments()
+            return (segments[0] if segments else 1), 0
+
+    def _write_checkpoint(self, position: Tuple[int, int]):
+        path = os.path.join(self.directory, CHECKPOINT_FILENAME)
+        with io.open(path + ".tmp", mode="w") as f:
+            f.write("{} {}".format(*position))
+            f.flush()
+            if self.sync:
+                os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+
+    def _recover(self):
+        """Truncates a partially written tail and opens the last segment."""
+        segments = [i for i in self._segments() if i >= self._checkpoint[0]]
+        segment = segments[-1] if segments else self._checkpoint[0]
+        path = self._segment_path(segment)
+
+        end = self._checkpoint[1] if segment == self._checkpoint[0] else 0
+        if os.path.exists(path):
+            size = os.path.getsize(path)
+            with io.open(path, mode="rb") as f:
+                f.seek(end)
+                while end < size:
+                    record_end = skip_record(f, size)
+                    if record_end is None:
+                        break
+                    end = record_end
+            if end < size:
+                with io.open(path, mode="r+b") as f:
+                    f.truncate(end)
+
+        self._segment = segment
+        self._fp = io.open(path, mode="ab")
+        # Journaled FlowFiles are counted when sent, not when journaled
+        self._writer = FlowFileStreamWriter(self._fp, metrics=False)
+        self._committed_position = (segment, end)
+
+    def _roll_segment(self):
+        self._writer.close()
+        self._fp.flush()
+        if self.sync:
+            os.fsync(self._fp.fileno())
+        self._fp.close()
+        self._segment += 1
+        self._fp = io.open(self._segment_path(self._segment), mode="ab")
+        self._writer = FlowFileStreamWriter(self._fp, metrics=False)
+
+    def append(self, flowfile: FlowFile) -> int:
+        """Appends `flowfile` to the journal, returns its sequence number."""
+        with self._write_lock:
+            if self._fp.tell() >= self.segment_size:
+                self._roll_segment()
+            self._writer.write(flowfile)
+            self._appended += 1
+            return self._appended
+
+    def commit(self, sequence: int = None):
+        """Makes every record up to `sequence` (default: all) durable."""
+        sequence = self._appended if sequence is None else sequence
+        with self._commit_lock:
+            if self._committed >= sequence:
+                return
+            with self._write_lock:
+                self._fp.flush()
+                committed = self._appended
+                position = (self._segment, self._fp.tell())
+                fd = os.dup(self._fp.fileno())
+            try:
+                if self.sync:
+                    os.fsync(fd)
+            finally:
+                os.close(fd)
+            self._committed = committed
+            self._committed_position = position
+
+    def read_batch(self, max_records: int) -> List[Tuple[Tuple[int, int], FlowFile]]:
+        """
+        Reads up to `max_records` committed FlowFiles after the last one read,
+        returns them with the position to `checkpoint` once they are handled.
+        """
+        rv = []
+        segment, offset = self._read_position
+        end_segment, end_offset = self._committed_position
+        while len(rv) < max_records and (segment, offset) < (end_segment, end_offset):
+            path = self._segment_path(segment)
+            size = end_offset if segment == end_segment else os.path.getsize(path)
+            if offset >= size:
+                segment, offset = segment + 1, 0
+                continue
+            with io.open(path, mode="rb") as f:
+                f.seek(offset)
+                while len(rv) < max_records and offset < size:
+                    flowfile = read_record(f)
+                    offset = f.tell()
+                    rv.append(((segment, offset), flowfile))
+        self._read_position = (segment, offset)
+        return rv
+
+    def checkpoint(self, position: Tuple[int, int]):
+        """Acknowledges every record up to `position`, removing consumed segments."""
+        self._write_checkpoint(position)
+        for segment in self._segments():
+            if segment >= min(position[0], self._segment):
+                break
+            os.remove(self._segment_path(segment))
+        self._checkpoint = position
+
+    def rewind(self):
+        """Re-reads every record after the last checkpoint."""
+        self._read_position = self._checkpoint
+
+    def close(self):
+        self.commit()
+        self._writer.close()
+        self._fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
@@ -0,0 +1,202 @@
+"""Low-overhead metrics for NiFi's FlowFile readers, writers and processors.
+
+Instrumented code reports to the module level `sink`, which is None by default so
+that disabled metrics cost a single attribute lookup. Any object implementing
+`inc(name, value=1, **labels)` and `observe(name, value, **labels)` can be used as
+a sink, e.g. a `MetricsRegistry` or a `StatsdSink`.
+
+    from nifi.flowfile import metrics
+
+    registry = metrics.MetricsRegistry()
+    metrics.set_sink(registry)
+    print(registry.render_prometheus())
+"""
+import bisect
+import threading
+
+DEFAULT_BUCKETS = (
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1.0,
+    5.0,
+    10.0,
+    float("inf"),
+)
+
+sink = None
+
+
+def set_sink(new_sink):
+    """Sets the sink all instrumented code reports to, None disables metrics."""
+    global sink
+    sink = new_sink
+
+
+def get_sink():
+    return sink
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels, **extra):
+    items = list(labels) + sorted(extra.items())
+    if not items:
+        return ""
+    return "{{{}}}".format(
+        ",".join('{}="{}"'.format(k, str(v).replace('"', '\\"')) for k, v in items)
+    )
+
+
+class Histogram(object):
+    """Cumulative histogram over fixed bucket upper bounds."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry(object):
+    """
+    In-process sink holding counters and histograms, keyed by name and labels.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def get_counter(self, name, **labels):
+        return self._counters.get((name, _label_key(labels)), 0)
+
+    def get_histogram(self, name, **labels) -> Histogram:
+        return self._histograms.get((name, _label_key(labels)))
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render_prometheus(self) -> str:
+        """Renders every metric in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+            histograms = [
+                (key, list(h.counts), h.sum, h.count) for key, h in histograms
+            ]
+
+        last_name = None
+        for (name, labels), value in counters:
+            if name != last_name:
+                lines.append("# TYPE {} counter".format(name))
+                last_name = name
+            lines.append("{}{} {}".format(name, _format_labels(labels), value))
+
+        for (name, labels), counts, total, count in histograms:
+            if name != last_name:
+                lines.append("# TYPE {} histogram".format(name))
+                last_name = name
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(
+                    "{}_bucket{} {}".format(
+                        name, _format_labels(labels, le=le), cumulative
+                    )
+                )
+            lines.append("{}_sum{} {}".format(name, _format_labels(labels), total))
+            lines.append("{}_count{} {}".format(name, _format_labels(labels), count))
+        return "\n".join(lines) + "\n"
+
+
+class StatsdSink(object):
+    """
+    Sink sending every update to a StatsD daemon over UDP, labels are sent as
+    DogStatsD tags.
+    """
+
+    def __init__(self, host="localhost", port=8125, prefix="", tags=True):
+        self.address = (host, port)
+        self.prefix = prefix
+        self.tags = tags
+
+        import socket
+
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def _send(self, name, value, kind, labels):
+        line = "{}{}:{}|{}".format(self.prefix, name, value, kind)
+        if self.tags and labels:
+            line += "|#" + ",".join("{}:{}".format(k, v) for k, v in labels.items())
+        try:
+            self._socket.sendto(line.encode("utf-8"), self.address)
+        except OSError:
+            pass
+
+    def inc(self, name, value=1, **labels):
+        self._send(name, value, "c", labels)
+
+    def observe(self, name, value, **labels):
+        self._send(name, value, "h", labels)
+
+    def close(self):
+        self._socket.close()
+
+
+def start_http_server(registry: MetricsRegistry, port=9090, addr=""):
+    """Serves `registry` in the Prometheus text format from a daemon thread."""
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+
+    class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+        daemon_threads = True
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = registry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((addr, port), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,264 @@
+"""Lazy, composable FlowFile pipelines.
+
+Stages are chained generators, so FlowFiles stream from the source to the sink one
+at a time and memory stays constant regardless of the input size.
+
+    from nifi.flowfile.pipeline import from_file, to_file
+
+    (
+        from_file("in.ff3")
+        .filter(lambda ff: ff["mime.type"] == "text/csv")
+        .map(transform, workers=4)
+        .sink(to_file("out.ff3"))
+    )
+
+`map` and `flat_map` can run in a thread or process pool. At most `buffer` items
+are in flight, so a slow stage holds back the source instead of buffering it, and
+the output keeps the order of the input.
+"""
+import io
+import sys
+import time
+from collections import deque
+from functools import partial
+from itertools import chain, islice
+from typing import Callable, Iterable, Iterator
+
+from .flowfile import FlowFile
+from .stream import FlowFileStreamReader, FlowFileStreamWriter
+
+EXECUTORS = ("thread", "process")
+LONG_POLL_SECONDS = 20
+IDLE_BACKOFF = 0.5
+MAX_IDLE_BACKOFF = 10.0
+
+
+def _call_list(fn, item):
+    return list(fn(item))
+
+
+def _parallel_map(fn, iterable, workers, executor, buffer):
+    if executor == "thread":
+        from concurrent.futures import ThreadPoolExecutor as Executor
+    else:
+        from concurrent.futures import ProcessPoolExecutor as Executor
+
+    pending = deque()
+    pool = Executor(workers)
+    try:
+        for item in iterable:
+            if len(pending) >= buffer:
+                yield pending.popleft().result()
+            pending.append(pool.submit(fn, item))
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+        pool.shutdown(wait=True)
+
+
+def _batch(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Pipeline(object):
+    """
+    A lazy chain of stages over an iterable of FlowFiles (or batches of them).
+
+    Every stage returns a new Pipeline and nothing runs until the pipeline is
+    iterated or drained with `sink`.
+    """
+
+    def __init__(self, source: Iterable):
+        self._source = source
+
+    def __iter__(self) -> Iterator:
+        return iter(self._source)
+
+    def filter(self, fn: Callable) -> "Pipeline":
+        return Pipeline(filter(fn, self._source))
+
+    def map(self, fn: Callable, workers=None, executor="thread", buffer=None):
+        """
+        Applies `fn` to every item, in a pool of `workers` threads or processes
+        when given, keeping at most `buffer` (default twice `workers`) in flight.
+        """
+        if workers is None:
+            return Pipeline(map(fn, self._source))
+        if executor not in EXECUTORS:
+            raise ValueError(
+                "'executor' must be one of {}".format(", ".join(EXECUTORS))
+            )
+        buffer = buffer or 2 * workers
+        return Pipeline(_parallel_map(fn, self._source, workers, executor, buffer))
+
+    def flat_map(self, fn: Callable, workers=None, executor="thread", buffer=None):
+        """Like `map` for an `fn` returning zero or more items per item."""
+        if workers is None:
+            return Pipeline(chain.from_iterable(map(fn, self._source)))
+        mapped = self.map(partial(_call_list, fn), workers, executor, buffer)
+        return Pipeline(chain.from_iterable(mapped))
+
+    def batch(self, size: int) -> "Pipeline":
+        """Groups items into lists of up to `size` items."""
+        return Pipeline(_batch(self._source, size))
+
+    def unbatch(self) -> "Pipeline":
+        return Pipeline(chain.from_iterable(self._source))
+
+    def sink(self, target) -> int:
+        """
+        Drains the pipeline into `target`, returns the number of items written.
+
+        `target` is a callable, an object with a `write` method such as a
+        FlowFileStreamWriter, or a `Sink`, which is closed afterwards.
+        """
+        write = target if callable(target) else target.write
+        count = 0
+        try:
+            for item in self._source:
+                write(item)
+                count += 1
+        finally:
+            if isinstance(target, Sink):
+                target.close()
+        return count
+
+
+def pipeline(source: Iterable) -> Pipeline:
+    return Pipeline(source)
+
+
+class Sink(object):
+    """Base class of the sinks closed by `Pipeline.sink` once drained."""
+
+    def write(self, item):
+        raise NotImplementedError()
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+
+class FileSink(Sink):
+    """Writes FlowFiles, or batches of them, as FlowFile Stream v3."""
+
+    def __init__(self, fp, should_close=False):
+        self._fp = fp
+        self._should_close = should_close
+        self._writer = FlowFileStreamWriter(fp)
+
+    def write(self, item):
+        if isinstance(item, FlowFile):
+            self._writer.write(item)
+        else:
+            self._writer.write_all(item)
+
+    def close(self):
+        self._writer.close()
+        if self._should_close:
+            self._fp.close()
+        else:
+            self._fp.flush()
+
+
+class QueueSink(Sink):
+    """Sends FlowFiles to a NiFiQueue, a batch of FlowFiles is sent as one message."""
+
+    def __init__(self, queue, port_id, response_port_prefix=None):
+        self.queue = queue
+        self.port_id = port_id
+        self.response_port_prefix = response_port_prefix
+
+    def write(self, item):
+        if isinstance(item, FlowFile):
+            item = [item]
+        self.queue.add_flowfiles(self.port_id, item, self.response_port_prefix)
+
+
+def from_file(file, **kwargs) -> Pipeline:
+    """FlowFiles read from a FlowFile Stream v3 file name or binary file object."""
+
+    def source():
+        if isinstance(file, (str, bytes)) or hasattr(file, "__fspath__"):
+            with io.open(file, mode="rb") as fp:
+                yield from FlowFileStreamReader(fp, **kwargs)
+        else:
+            yield from FlowFileStreamReader(file, **kwargs)
+
+    return Pipeline(source())
+
+
+def from_stdin(**kwargs) -> Pipeline:
+    return from_file(sys.stdin.buffer, **kwargs)
+
+
+def from_queue(queue, wait_seconds=None, max_messages=10, stop_when_empty=True):
+    """
+    FlowFiles received from a NiFiQueue, whatever their input port.
+
+    The messages of a receive are deleted once all of their FlowFiles have been
+    pulled downstream, so FlowFiles are delivered at least once.
+
+    Unless `stop_when_empty`, receives long poll for `wait_seconds` (default: 20).
+    Short polls of an empty queue are spaced by a delay doubling up to 10 seconds.
+    """
+    from nifi.sqs_workers.codec import get_codec
+    from sqs_workers.processors import get_job_content_type
+
+    if wait_seconds is None:
+        wait_seconds = 0 if stop_when_empty else LONG_POLL_SECONDS
+
+    def source():
+        backoff = 0.0
+        while True:
+            messages = queue.get_raw_messages(wait_seconds, max_messages)
+            if not messages:
+                if stop_when_empty:
+                    return
+                if not wait_seconds:
+                    backoff = min(max(2 * backoff, IDLE_BACKOFF), MAX_IDLE_BACKOFF)
+                    time.sleep(backoff)
+                continue
+            backoff = 0.0
+            for message in messages:
+                codec = get_codec(get_job_content_type(message))
+                if hasattr(codec, "iter_deserialize"):
+                    yield from codec.iter_deserialize(message.body)
+                else:
+                    yield from codec.deserialize(message.body)
+            for batch in _batch(messages, 10):
+                entries = [
+                    {"Id": str(i), "ReceiptHandle": m.receipt_handle}
+                    for i, m in enumerate(batch)
+                ]
+                queue.get_queue().delete_messages(Entries=entries)
+
+    return Pipeline(source())
+
+
+def to_file(file) -> FileSink:
+    """A sink writing to a FlowFile Stream v3 file name or binary file object."""
+    if isinstance(file, (str, bytes)) or hasattr(file, "__fspath__"):
+        return FileSink(io.open(file, mode="wb"), should_close=True)
+    return FileSink(file)
+
+
+def to_stdout() -> FileSink:
+    return FileSink(sys.stdout.buffer)
+
+
+def to_queue(queue, port_id, response_port_prefix=None) -> QueueSink:
+    return QueueSink(queue, port_id, response_port_prefix)
@@ -0,0 +1,405 @@
+"""NiFi-style provenance events tracing the lineage of FlowFiles.
+
+FlowFile mutations, NiFi processors and queues report events to the module level
+`recorder`. Like `metrics.sink`, it is None by default so that disabled
+provenance costs a single attribute lookup: instrumented code reads it once and
+only looks up uuids and calls `record` when it is set.
+
+    from nifi.flowfile import provenance
+
+    store = provenance.ProvenanceEventStore("provenance")
+    provenance.set_recorder(provenance.ProvenanceRecorder(store, sample_rate=0.1))
+    ...
+    store.lineage(uuid)
+
+`ProvenanceRecorder.record` only appends the event to a deque, which is
+thread-safe without a lock. A background thread writes the buffered events to the
+store in batches, so the processing path never waits for the disk.
+"""
+import io
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque, namedtuple
+from enum import Enum
+from typing import Dict, Iterator, List, Tuple
+
+from .attributes import CoreAttributes
+
+DEFAULT_BATCH_SIZE = 1024
+DEFAULT_MAX_BUFFER = 65536
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_SEGMENT_SIZE = 64 * 1024 * 1024
+DEFAULT_MAX_LINEAGES = 65536
+SEGMENT_SUFFIX = ".ff3"
+INDEX_SUFFIX = ".idx"
+
+# FlowFile Stream v3 attributes of a stored event, any other attribute is a detail
+EVENT_TYPE = "event.type"
+EVENT_TIME = "event.time"
+EVENT_UUID = "event.uuid"
+EVENT_PARENTS = "event.parents"
+EVENT_CHILDREN = "event.children"
+_EVENT_FIELDS = {EVENT_TYPE, EVENT_TIME, EVENT_UUID, EVENT_PARENTS, EVENT_CHILDREN}
+
+logger = logging.getLogger(__name__)
+
+
+class ProvenanceEventType(Enum):
+    """
+    ref: https://github.com/apache/nifi/blob/main/nifi-api/src/main/java/org/apache/nifi/provenance/ProvenanceEventType.java
+    """  # noqa: E501
+
+    RECEIVE = "RECEIVE"
+    SEND = "SEND"
+    ATTRIBUTES_MODIFIED = "ATTRIBUTES_MODIFIED"
+    FORK = "FORK"
+    JOIN = "JOIN"
+    DROP = "DROP"
+
+
+ProvenanceEvent = namedtuple(
+    "ProvenanceEvent", "event_type timestamp uuid parent_uuids child_uuids details"
+)
+
+recorder = None
+
+
+def set_recorder(new_recorder):
+    """Sets the recorder all instrumented code reports to, None disables provenance."""
+    global recorder
+    recorder = new_recorder
+
+
+def get_recorder():
+    return recorder
+
+
+def flowfile_uuid(flowfile) -> str:
+    """The uuid of `flowfile`, also when set as a `CoreAttributes.UUID` key."""
+    attributes = flowfile.get_attributes()
+    return attributes.get(CoreAttributes.UUID) or attributes.get("uuid")
+
+
+class ProvenanceRecorder(object):
+    """
+    Buffers provenance events and writes them to `store` from a daemon thread.
+
+    Only the events of `event_types` (default: all) are recorded, of a
+    `sample_rate` fraction of the lineages. Whether a lineage is sampled depends on
+    a hash of its root uuid only, so all of its events are kept or dropped
+    together. Up to `max_lineages` FlowFiles created by a FORK or a uuid change are
+    remembered to belong to the lineage of their parent, older ones are sampled as
+    their own root. Once `max_buffer` events wait to be written new events are
+    dropped and counted in `dropped`, rather than slowing down the processing path.
+    """
+
+    def __init__(
+        self,
+        store: "ProvenanceEventStore",
+        sample_rate=1.0,
+        event_types=None,
+        batch_size=DEFAULT_BATCH_SIZE,
+        max_buffer=DEFAULT_MAX_BUFFER,
+        flush_interval=DEFAULT_FLUSH_INTERVAL,
+        max_lineages=DEFAULT_MAX_LINEAGES,
+    ):
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("'sample_rate' must be between 0 and 1")
+        self.store = store
+        self.sample_rate = sample_rate
+        self.max_lineages = max_lineages
+        self.event_types = frozenset(event_types) if event_types else None
+        self.batch_size = batch_size
+        self.max_buffer = max_buffer
+        self.flush_interval = flush_interval
+        self.dropped = 0
+
+        self._roots = OrderedDict()
+        self._buffer = deque()
+        self._drain_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def record(self, event_type, uuid, parents=(), children=(), **details):
+        if self.event_types is not None and event_type not in self.event_types:
+            return
+        if self.sample_rate < 1.0 and not self._sampled(uuid, parents, children):
+            return
+        buffer = self._buffer
+        if len(buffer) >= self.max_buffer:
+            self.dropped += 1
+            return
+        buffer.append(
+            ProvenanceEvent(
+                event_type, time.time(), uuid, tuple(parents), tuple(children), details
+            )
+        )
+        if len(buffer) == self.batch_size:
+            self._wakeup.set()
+
+    def _sampled(self, uuid, parents, children) -> bool:
+        first = parents[0] if parents else uuid
+        roots = self._roots
+        root = roots.get(first, first)
+        for other in (uuid,) + tuple(children):
+            if other is not None and other != first:
+                roots[other] = root
+        while len(roots) > self.max_lineages:
+            roots.popitem(last=False)
+        return zlib.crc32((root or "").encode()) < self.sample_rate * 2**32
+
+    def _drain(self):
+        buffer = self._buffer
+        # Also waits for the batch being written by the other thread, if any
+        with self._drain_lock:
+            while buffer:
+                batch = []
+                while buffer and len(batch) < self.batch_size:
+                    batch.append(buffer.popleft())
+                self.store.append_all(batch)
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self._drain()
+            except Exception:
+                logger.exception("Error while writing provenance events")
+
+    def flush(self):
+        """Writes every buffered event, from the calling thread."""
+        self._drain()
+
+    def close(self):
+        self._stopped = True
+        self._wakeup.set()
+        self._thread.join()
+        self._drain()
+
+
+class ProvenanceEventStore(object):
+    """
+    Append-only store of provenance events, indexed by uuid.
+
+    Events are written as empty FlowFile Stream v3 records to segment files of
+    `directory`. Every uuid an event refers to, including its parents and children,
+    is indexed in an append-only index file per segment mapping it to the event's
+    offset. The indexes of the segments kept are loaded on open and held in memory,
+    so memory grows with the uuids stored. With `max_segments` only that many
+    segments are kept, the oldest is removed along with its index whenever a new
+    one is started, see `expire`.
+    """
+
+    def __init__(self, directory, segment_size=DEFAULT_SEGMENT_SIZE, max_segments=None):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.max_segments = max_segments
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # segment -> uuid -> offsets of its events in the segment
+        self._indexes = {}
+        segments = self._segments()
+        for segment in segments:
+            self._indexes[segment] = self._load_index(segment)
+
+        # A new segment on every open, after any partially written record
+        self._segment = segments[-1] + 1 if segments else 1
+        self._open_segment()
+        if max_segments is not None:
+            self.expire(max_segments)
+
+    def __len__(self):
+        """The number of uuids indexed."""
+        with self._lock:
+            return len(set().union(*self._indexes.values()))
+
+    def __contains__(self, uuid):
+        with self._lock:
+            return any(uuid in index for index in self._indexes.values())
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, "{:012d}{}".format(segment, SEGMENT_SUFFIX))
+
+    def _index_path(self, segment: int) -> str:
+        return os.path.join(self.directory, "{:012d}{}".format(segment, INDEX_SUFFIX))
+
+    def _segments(self) -> List[int]:
+        return sorted(
+            int(name[: -len(SEGMENT_SUFFIX)])
+            for name in os.listdir(self.directory)
+            if name.endswith(SEGMENT_SUFFIX)
+        )
+
+    def _open_segment(self):
+        from .stream import FlowFileStreamWriter
+
+        self._fp = io.open(self._segment_path(self._segment), mode="ab")
+        # Events are not FlowFiles, they are kept out of the stream metrics
+        self._writer = FlowFileStreamWriter(self._fp, metrics=False)
+        self._index_fp = io.open(
+            self._index_path(self._segment), mode="a", encoding="utf-8"
+        )
+        self._indexes[self._segment] = {}
+
+    def _close_segment(self):
+        self._writer.close()
+        self._fp.close()
+        self._index_fp.close()
+
+    def _load_index(self, segment: int) -> Dict[str, List[int]]:
+        index = {}
+        try:
+            with io.open(self._index_path(segment)) as f:
+                for line in f:
+                    fields = line.split()
+                    if len(fields) != 2 or not line.endswith("\n"):
+                        continue  # partially written
+                    uuid, offset = fields
+                    index.setdefault(uuid, []).append(int(offset))
+        except FileNotFoundError:
+            pass
+        return index
+
+    def expire(self, max_segments: int) -> List[int]:
+        """
+        Removes all but the `max_segments` newest segments and their events from the
+        index, the segment being written is always kept. Returns the removed ones.
+        """
+        with self._lock:
+            expired = sorted(self._indexes)[: -max(max_segments, 1)]
+            for segment in expired:
+                del self._indexes[segment]
+                # The index first, a segment without one is still found and expired
+                for path in (self._index_path(segment), self._segment_path(segment)):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+        return expired
+
+    def append_all(self, events: List[ProvenanceEvent]):
+        from .flowfile import FlowFile
+
+        with self._lock:
+            rolled = self._fp.tell() >= self.segment_size
+            if rolled:
+                self._close_segment()
+                self._segment += 1
+                self._open_segment()
+
+            index, lines = self._indexes[self._segment], []
+            for event in events:
+                offset = self._fp.tell()
+                self._writer.write(FlowFile(_event_attributes(event)))
+                for uuid in (event.uuid,) + event.parent_uuids + event.child_uuids:
+                    if uuid is None:
+                        continue
+                    index.setdefault(uuid, []).append(offset)
+                    lines.append("{} {}\n".format(uuid, offset))
+            self._fp.flush()
+            # The index only refers to events already written
+            self._index_fp.write("".join(lines))
+            self._index_fp.flush()
+
+        if rolled and self.max_segments is not None:
+            self.expire(self.max_segments)
+
+    def _positions(self, uuid: str) -> List[Tuple[int, int]]:
+        with self._lock:
+            return [
+                (segment, offset)
+                for segment, index in self._indexes.items()
+                for offset in index.get(uuid, ())
+            ]
+
+    def _read(self, positions) -> Dict[Tuple[int, int], ProvenanceEvent]:
+        from .journal import read_record
+
+        by_segment = {}
+        for segment, offset in positions:
+            by_segment.setdefault(segment, []).append(offset)
+
+        rv = {}
+        for segment, offsets in by_segment.items():
+            try:
+                f = io.open(self._segment_path(segment), mode="rb")
+            except FileNotFoundError:
+                continue  # expired since looked up
+            with f:
+                for offset in sorted(offsets):
+                    f.seek(offset)
+                    event = _to_event(read_record(f).get_attributes())
+                    rv[(segment, offset)] = event
+        return rv
+
+    def _sorted(self, events) -> List[ProvenanceEvent]:
+        return sorted(events, key=lambda event: event.timestamp)
+
+    def get_events(self, uuid: str) -> List[ProvenanceEvent]:
+        """The events of `uuid`, or of which it is a parent or child, oldest first."""
+        return self._sorted(self._read(self._positions(uuid)).values())
+
+    def lineage(self, uuid: str) -> List[ProvenanceEvent]:
+        """Every event of the ancestors and descendants of `uuid`, oldest first."""
+        events = {}
+        seen, pending = {uuid}, [uuid]
+        while pending:
+            positions = self._positions(pending.pop())
+            new_events = self._read([p for p in positions if p not in events])
+            events.update(new_events)
+            for event in new_events.values():
+                for other in (event.uuid,) + event.parent_uuids + event.child_uuids:
+                    if other is not None and other not in seen:
+                        seen.add(other)
+                        pending.append(other)
+        return self._sorted(events.values())
+
+    def __iter__(self) -> Iterator[ProvenanceEvent]:
+        from .stream import FlowFileStreamReader
+
+        with self._lock:
+            self._fp.flush()
+        for segment in self._segments():
+            try:
+                f = io.open(self._segment_path(segment), mode="rb")
+            except FileNotFoundError:
+                continue  # expired since listed
+            with f:
+                for flowfile in FlowFileStreamReader(f, metrics=False):
+                    yield _to_event(flowfile.get_attributes())
+
+    def close(self):
+        with self._lock:
+            self._close_segment()
+
+
+def _event_attributes(event: ProvenanceEvent) -> dict:
+    attributes = {
+        EVENT_TYPE: event.event_type.value,
+        EVENT_TIME: repr(event.timestamp),
+        EVENT_UUID: event.uuid or "",
+        EVENT_PARENTS: ",".join(filter(None, event.parent_uuids)),
+        EVENT_CHILDREN: ",".join(filter(None, event.child_uuids)),
+    }
+    for key, value in event.details.items():
+        attributes[key] = str(value)
+    return attributes
+
+
+def _to_event(attributes: dict) -> ProvenanceEvent:
+    parents, children = attributes[EVENT_PARENTS], attributes[EVENT_CHILDREN]
+    return ProvenanceEvent(
+        ProvenanceEventType(attributes[EVENT_TYPE]),
+        float(attributes[EVENT_TIME]),
+        attributes[EVENT_UUID] or None,
+        tuple(parents.split(",")) if parents else (),
+        tuple(children.split(",")) if children else (),
+        {k: v for k, v in attributes.items() if k not in _EVENT_FIELDS},
+    )
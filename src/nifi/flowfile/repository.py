@@ -0,0 +1,292 @@
+"""Disk-backed content repository for NiFi's FlowFile content"""
+import io
+import os
+import threading
+import weakref
+
+DEFAULT_THRESHOLD = 1024 * 1024
+DEFAULT_SEGMENT_SIZE = 64 * 1024 * 1024
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+class ContentSegment(object):
+    """
+    An append-only file holding the content of many claims.
+
+    The file is removed once it is no longer written to and every claim on it has
+    been released, `on_removed` is then called.
+    """
+
+    def __init__(self, path, on_removed=None):
+        self.path = path
+        self.size = 0
+        self.claimant_count = 0
+        self.writable = True
+        self.removed = False
+        self.on_removed = on_removed
+        # Claims are released by finalizers, which may run while the lock is held
+        self._lock = threading.RLock()
+
+    def acquire(self):
+        with self._lock:
+            self.claimant_count += 1
+
+    def release(self):
+        with self._lock:
+            self.claimant_count -= 1
+            self._remove_if_unused()
+
+    def seal(self):
+        with self._lock:
+            self.writable = False
+            self._remove_if_unused()
+
+    def _remove_if_unused(self):
+        if self.claimant_count == 0 and not self.writable and not self.removed:
+            self.removed = True
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            if self.on_removed is not None:
+                self.on_removed()
+
+
+class ContentClaim(object):
+    """
+    A reference to `length` bytes of content starting at `offset` of a segment.
+
+    Claims are shared by every FlowFile derived from the one that created them,
+    the segment reference is released when the last of them is garbage collected.
+    """
+
+    __slots__ = ("segment", "offset", "length", "__weakref__")
+
+    def __init__(self, segment: ContentSegment, offset: int, length: int):
+        self.segment = segment
+        self.offset = offset
+        self.length = length
+        segment.acquire()
+        weakref.finalize(self, segment.release)
+
+    def __len__(self):
+        return self.length
+
+    def __repr__(self):
+        return "<nifi.flowfile.repository.ContentClaim {}@{}+{}>".format(
+            os.path.basename(self.segment.path), self.offset, self.length
+        )
+
+    def iter_chunks(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        with io.open(self.segment.path, mode="rb") as f:
+            f.seek(self.offset)
+            remaining = self.length
+            while remaining > 0:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    raise IOError("Content claim is truncated")
+                remaining -= len(chunk)
+                yield chunk
+
+    def read(self) -> bytes:
+        return b"".join(self.iter_chunks())
+
+
+class InMemoryContent(object):
+    """
+    Content held in memory and accounted in a repository's memory budget.
+
+    Like claims, it is shared by every FlowFile derived from the one read, the
+    accounting is released when the last of them is garbage collected.
+    """
+
+    __slots__ = ("data", "__weakref__")
+
+    def __init__(self, data: bytes, release):
+        self.data = data
+        weakref.finalize(self, release, len(data))
+
+    def __len__(self):
+        return len(self.data)
+
+    def iter_chunks(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        if self.data:
+            yield self.data
+
+    def read(self) -> bytes:
+        return self.data
+
+
+class ContentClaimWriter(object):
+    """
+    Writes the content of a single claim to its own segment as it arrives, for
+    content whose length is known before all of it is available.
+    """
+
+    def __init__(self, segment: ContentSegment):
+        self.segment = segment
+        self._fp = io.open(segment.path, mode="wb")
+
+    def write(self, chunk):
+        self._fp.write(chunk)
+        self.segment.size += len(chunk)
+
+    def close(self) -> ContentClaim:
+        """Completes the content, returns its claim."""
+        self._fp.close()
+        claim = ContentClaim(self.segment, 0, self.segment.size)
+        self.segment.seal()
+        return claim
+
+    def discard(self):
+        """Drops the content written so far."""
+        self._fp.close()
+        self.segment.seal()
+
+
+class ContentRepository(object):
+    """
+    Stores FlowFile content in append-only segment files.
+
+    Content larger than `threshold` bytes, or any content once `memory_budget`
+    bytes are already held in memory by FlowFiles read through this repository,
+    is written to disk and replaced by a `ContentClaim` that is read back lazily.
+    Content kept in memory is wrapped in an `InMemoryContent`, whose accounting is
+    released once no FlowFile refers to it anymore.
+
+    When no `directory` is given a temporary one is created. It is removed once
+    the repository is closed and the content of every FlowFile read through it
+    has been garbage collected, so FlowFiles outliving `close` stay readable.
+    """
+
+    def __init__(
+        self,
+        directory=None,
+        threshold=DEFAULT_THRESHOLD,
+        memory_budget=None,
+        segment_size=DEFAULT_SEGMENT_SIZE,
+    ):
+        self._should_remove_directory = directory is None
+        if directory is None:
+            import tempfile
+
+            directory = tempfile.mkdtemp(prefix="ffcr-")
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+
+        self.threshold = threshold
+        self.memory_budget = memory_budget
+        self.segment_size = segment_size
+        self.memory_usage = 0
+
+        self._lock = threading.Lock()
+        # Not `_lock`: `_untrack` runs from finalizers, which may fire on any
+        # allocation, also while `_lock` is held by `_append` on the same thread.
+        self._memory_lock = threading.Lock()
+        self._segments_lock = threading.RLock()
+        self._live_segments = 0
+        self._closed = False
+        self._segment_index = 0
+        self._segment = None
+        self._fp = None
+
+    def _new_segment(self) -> ContentSegment:
+        self._segment_index += 1
+        path = os.path.join(self.directory, "{:012d}.seg".format(self._segment_index))
+        with self._segments_lock:
+            self._live_segments += 1
+        return ContentSegment(path, self._segment_removed)
+
+    def _roll_segment(self):
+        if self._segment is not None:
+            self._fp.close()
+            self._segment.seal()
+        self._segment = self._new_segment()
+        self._fp = io.open(self._segment.path, mode="wb")
+
+    def _append(self, chunks) -> ContentClaim:
+        with self._lock:
+            if self._segment is None or self._segment.size >= self.segment_size:
+                self._roll_segment()
+            offset = self._segment.size
+            for chunk in chunks:
+                self._fp.write(chunk)
+                self._segment.size += len(chunk)
+            self._fp.flush()
+            return ContentClaim(self._segment, offset, self._segment.size - offset)
+
+    def claim(self, content: bytes) -> ContentClaim:
+        """Writes `content` to the repository."""
+        return self._append((content,))
+
+    def claim_stream(self, fp, length: int, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Copies `length` bytes of `fp` to the repository without buffering them."""
+
+        def chunks():
+            remaining = length
+            while remaining > 0:
+                chunk = fp.read(min(chunk_size, remaining))
+                if not chunk:
+                    raise IOError("Not in FlowFile-v3 format")
+                remaining -= len(chunk)
+                yield chunk
+
+        return self._append(chunks())
+
+    def claim_writer(self) -> ContentClaimWriter:
+        """A writer of content arriving piecemeal, e.g. from a socket."""
+        with self._lock:
+            return ContentClaimWriter(self._new_segment())
+
+    def should_spill(self, length: int) -> bool:
+        if length > self.threshold:
+            return True
+        if self.memory_budget is None:
+            return False
+        return self.memory_usage + length > self.memory_budget
+
+    def read(self, fp, length: int):
+        """Reads `length` bytes of content from `fp`, spilling to disk if needed."""
+        if self.should_spill(length):
+            return self.claim_stream(fp, length)
+        return self.track(fp.read(length))
+
+    def track(self, content: bytes) -> InMemoryContent:
+        """Accounts `content` until the returned holder is garbage collected."""
+        # Nothing is allocated while holding the lock, no finalizer can run
+        with self._memory_lock:
+            self.memory_usage += len(content)
+        return InMemoryContent(content, self._untrack)
+
+    def _untrack(self, length):
+        with self._memory_lock:
+            self.memory_usage -= length
+
+    def _segment_removed(self):
+        with self._segments_lock:
+            self._live_segments -= 1
+            self._remove_directory_if_unused()
+
+    def _remove_directory_if_unused(self):
+        if self._closed and self._live_segments == 0 and self._should_remove_directory:
+            import shutil
+
+            self._should_remove_directory = False
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def close(self):
+        with self._lock:
+            if self._segment is not None:
+                self._fp.close()
+                self._segment.seal()
+                self._segment = None
+        with self._segments_lock:
+            self._closed = True
+            self._remove_directory_if_unused()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
@@ -0,0 +1,297 @@
+"""RouteOnAttribute-style routing of FlowFiles by their attributes.
+
+A rule routes to its target when all of its predicates match. `RoutingTable`
+compiles the rules into indexes over one predicate of each rule, so that the cost
+of routing grows with the number of rules that could match rather than with the
+number of rules:
+
+- equality predicates are looked up in hash buckets,
+- prefixes in buckets keyed by each distinct prefix length,
+- numeric comparisons by bisecting the sorted thresholds, and
+- regular expressions by their leading literal text, like prefixes, and those
+  without any are first tried together as a single alternation.
+
+    table = RoutingTable()
+    table.add("json", Equals("mime.type", "application/json"))
+    table.add("big-logs", Prefix("filename", "log-"), Compare("size", ">", 1e6))
+    table.route(flowfile)  # e.g. ["json"]
+"""
+import bisect
+import operator
+import re
+from typing import Dict, List
+
+import attr
+
+_METACHARACTERS = set(".^$*+?{}[]\\|()")
+_BACK_REFERENCE = re.compile(r"\\[1-9]|\(\?P=")
+
+COMPARE_OPERATORS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+
+def _to_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@attr.s(frozen=True)
+class Equals(object):
+    key = attr.ib()
+    value = attr.ib()
+
+    def __call__(self, attributes) -> bool:
+        return attributes.get(self.key) == self.value
+
+
+@attr.s(frozen=True)
+class Prefix(object):
+    key = attr.ib()
+    prefix = attr.ib()
+
+    def __call__(self, attributes) -> bool:
+        value = attributes.get(self.key)
+        return value is not None and value.startswith(self.prefix)
+
+
+@attr.s(frozen=True)
+class Regex(object):
+    """Matches when the whole attribute value matches `pattern`."""
+
+    key = attr.ib()
+    pattern = attr.ib()
+
+    def __call__(self, attributes) -> bool:
+        value = attributes.get(self.key)
+        return value is not None and re.fullmatch(self.pattern, value) is not None
+
+
+@attr.s(frozen=True)
+class Compare(object):
+    """Compares the attribute value as a number, non-numeric values never match."""
+
+    key = attr.ib()
+    op = attr.ib(validator=attr.validators.in_(COMPARE_OPERATORS))
+    value = attr.ib(converter=float)
+
+    def __call__(self, attributes) -> bool:
+        value = _to_number(attributes.get(self.key))
+        return value is not None and COMPARE_OPERATORS[self.op](value, self.value)
+
+
+@attr.s(frozen=True)
+class Rule(object):
+    target = attr.ib()
+    predicates = attr.ib(converter=tuple)
+
+    def __call__(self, attributes) -> bool:
+        return all(predicate(attributes) for predicate in self.predicates)
+
+
+def _literal_prefix(pattern: str) -> str:
+    """The literal text every match of `pattern` starts with, possibly empty."""
+    if "|" in pattern:
+        return ""
+    end = 0
+    while end < len(pattern) and pattern[end] not in _METACHARACTERS:
+        end += 1
+    if end < len(pattern) and pattern[end] in "*+?{":
+        end -= 1  # the quantifier applies to the last literal
+    return pattern[: max(end, 0)]
+
+
+def _combine(compiled):
+    """A single regex matching whenever one of `compiled` does, or None."""
+    patterns = [regex.pattern for regex, _ in compiled]
+    # Back references would point at the wrong groups once combined
+    if not patterns or any(_BACK_REFERENCE.search(p) for p in patterns):
+        return None
+    try:
+        return re.compile("|".join(map("(?:{})".format, patterns)))
+    except re.error:  # e.g. a group name used by several patterns
+        return None
+
+
+def _anchor_rank(predicate):
+    if isinstance(predicate, Equals):
+        return 0
+    if isinstance(predicate, Prefix):
+        return 1
+    if isinstance(predicate, Compare) and predicate.op != "!=":
+        return 2
+    if isinstance(predicate, Regex):
+        return 3
+    return 4
+
+
+class _CompiledTable(object):
+    """Indexes of a RoutingTable, each rule is indexed by its most selective predicate."""
+
+    def __init__(self, rules: List[Rule]):
+        self.targets = [rule.target for rule in rules]
+        self.residuals = []
+        self.unindexed = []
+        self.equals = {}
+        self.prefixes = {}
+        self.compares = {}
+        self.regexes = {}
+
+        for index, rule in enumerate(rules):
+            predicates = sorted(rule.predicates, key=_anchor_rank)
+            anchor = predicates[0] if predicates else None
+            rank = _anchor_rank(anchor) if anchor is not None else 4
+            if rank == 4:
+                self.unindexed.append(index)
+                self.residuals.append(predicates)
+                continue
+            self.residuals.append(predicates[1:])
+
+            if rank == 0:
+                buckets = self.equals.setdefault(anchor.key, {})
+                buckets.setdefault(anchor.value, []).append(index)
+            elif rank == 1:
+                buckets = self.prefixes.setdefault(anchor.key, {})
+                buckets.setdefault(anchor.prefix, []).append(index)
+            elif rank == 2:
+                by_op = self.compares.setdefault(anchor.key, {})
+                by_op.setdefault(anchor.op, []).append((anchor.value, index))
+            else:
+                self.regexes.setdefault(anchor.key, []).append((anchor.pattern, index))
+
+        self.prefixes = {
+            key: (sorted({len(prefix) for prefix in buckets}), buckets)
+            for key, buckets in self.prefixes.items()
+        }
+        for key, by_op in self.compares.items():
+            for op, entries in by_op.items():
+                if op == "==":
+                    equal = {}
+                    for threshold, index in entries:
+                        equal.setdefault(threshold, []).append(index)
+                    by_op[op] = equal
+                else:
+                    entries.sort()
+                    by_op[op] = ([t for t, _ in entries], [i for _, i in entries])
+        for key, entries in self.regexes.items():
+            by_prefix, unprefixed = {}, []
+            for pattern, index in entries:
+                prefix = _literal_prefix(pattern)
+                compiled = (re.compile(pattern), index)
+                if prefix:
+                    by_prefix.setdefault(prefix, []).append(compiled)
+                else:
+                    unprefixed.append(compiled)
+            lengths = sorted({len(prefix) for prefix in by_prefix})
+            self.regexes[key] = (lengths, by_prefix, _combine(unprefixed), unprefixed)
+
+        self.keys = set().union(self.equals, self.prefixes, self.compares, self.regexes)
+
+    def candidates(self, attributes: Dict[str, str]) -> List[int]:
+        rv = list(self.unindexed)
+        if len(attributes) < len(self.keys):
+            items = [(k, v) for k, v in attributes.items() if k in self.keys]
+        else:
+            items = [(k, attributes[k]) for k in self.keys if k in attributes]
+
+        for key, value in items:
+            buckets = self.equals.get(key)
+            if buckets is not None:
+                rv.extend(buckets.get(value, ()))
+
+            prefixes = self.prefixes.get(key)
+            if prefixes is not None:
+                lengths, buckets = prefixes
+                for length in lengths:
+                    if length > len(value):
+                        break
+                    rv.extend(buckets.get(value[:length], ()))
+
+            by_op = self.compares.get(key)
+            if by_op is not None:
+                number = _to_number(value)
+                if number is not None:
+                    rv.extend(_compare_candidates(by_op, number))
+
+            regexes = self.regexes.get(key)
+            if regexes is not None:
+                lengths, by_prefix, combined, unprefixed = regexes
+                for length in lengths:
+                    if length > len(value):
+                        break
+                    for regex, i in by_prefix.get(value[:length], ()):
+                        if regex.fullmatch(value):
+                            rv.append(i)
+                if unprefixed and (combined is None or combined.fullmatch(value)):
+                    rv.extend(i for regex, i in unprefixed if regex.fullmatch(value))
+        return rv
+
+
+def _compare_candidates(by_op, number):
+    for op, index in by_op.items():
+        if op == "==":
+            yield from index.get(number, ())
+            continue
+        thresholds, indexes = index
+        if op == ">":
+            yield from indexes[: bisect.bisect_left(thresholds, number)]
+        elif op == ">=":
+            yield from indexes[: bisect.bisect_right(thresholds, number)]
+        else:
+            # The thresholds above `number`, including it for "<="
+            if op == "<":
+                start = bisect.bisect_right(thresholds, number)
+            else:
+                start = bisect.bisect_left(thresholds, number)
+            yield from indexes[start:]
+
+
+class RoutingTable(object):
+    """
+    Ordered rules routing FlowFiles to every target whose predicates all match.
+
+    The table is compiled on first use after a change.
+    """
+
+    def __init__(self):
+        self.rules = []  # type: List[Rule]
+        self._compiled = None
+
+    def __len__(self):
+        return len(self.rules)
+
+    def add(self, target, *predicates) -> Rule:
+        """Routes to `target` when every predicate matches, always without any."""
+        rule = Rule(target, predicates)
+        self.rules.append(rule)
+        self._compiled = None
+        return rule
+
+    def compile(self):
+        compiled = self._compiled
+        if compiled is None:
+            compiled = self._compiled = _CompiledTable(self.rules)
+        return compiled
+
+    def route(self, flowfile) -> list:
+        """
+        Returns the targets of every rule matching the attributes of `flowfile` (or
+        an attributes dict), in the order the rules were added.
+        """
+        attributes = flowfile
+        if not isinstance(flowfile, dict):
+            attributes = flowfile.get_attributes()
+        compiled = self.compile()
+        residuals = compiled.residuals
+        return [
+            compiled.targets[index]
+            for index in sorted(compiled.candidates(attributes))
+            if all(predicate(attributes) for predicate in residuals[index])
+        ]
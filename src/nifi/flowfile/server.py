@@ -0,0 +1,325 @@
+"""ListenHTTP compatible FlowFile receiver"""
+import asyncio
+import logging
+import threading
+import zlib
+from functools import partial
+from http import HTTPStatus
+from uuid import uuid4
+
+from .flowfile import FlowFile
+from .repository import ContentRepository
+from .stream import FlowFileStreamDecoder
+
+logger = logging.getLogger(__name__)
+
+FLOWFILE_V3_CONTENT_TYPE = "application/flowfile-v3"
+DEFAULT_PATH = "/contentListener"
+DEFAULT_PORT = 8081
+DEFAULT_READ_SIZE = 64 * 1024
+DEFAULT_MAX_CONTENT_SIZE = 256 * 1024 * 1024
+DEFAULT_MEMORY_BUDGET = 64 * 1024 * 1024
+MAX_HEAD_SIZE = 64 * 1024
+
+
+class HTTPError(Exception):
+    def __init__(self, status: HTTPStatus, message=None):
+        super().__init__(message or status.phrase)
+        self.status = status
+
+
+class ListenHTTPServer(object):
+    """
+    asyncio HTTP server receiving FlowFiles the way NiFi's ListenHTTP does.
+
+    `application/flowfile-v3` bodies, as sent by InvokeHTTP and PostHTTP, are
+    decoded as they stream in and any other body becomes a single FlowFile. Each
+    FlowFile is given to `handler` before more of the body is read, so a slow
+    handler pushes back on the sender through TCP flow control. Contents above the
+    `content_repository` threshold, or beyond its memory budget shared by every
+    connection, are written to it as they arrive, so memory stays bounded however
+    large or many the requests. Without a repository a temporary one with a budget
+    of `DEFAULT_MEMORY_BUDGET` bytes is used. Coroutine handlers are awaited, other
+    callables run in the default executor.
+
+    Keep-alive, chunked transfer encoding and gzip content encoding are supported.
+    """
+
+    def __init__(
+        self,
+        handler,
+        host="0.0.0.0",
+        port=DEFAULT_PORT,
+        path=DEFAULT_PATH,
+        max_content_size=DEFAULT_MAX_CONTENT_SIZE,
+        read_size=DEFAULT_READ_SIZE,
+        content_repository: ContentRepository = None,
+    ):
+        self.handler = handler
+        self.host = host
+        self.port = port
+        self.path = path
+        self.max_content_size = max_content_size
+        self.read_size = read_size
+        self._should_close_repository = content_repository is None
+        if content_repository is None:
+            content_repository = ContentRepository(memory_budget=DEFAULT_MEMORY_BUDGET)
+        self.content_repository = content_repository
+        self._server = None
+        self._loop = None
+        self._thread = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port, limit=MAX_HEAD_SIZE
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        await self._server.wait_closed()
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+        if self._should_close_repository:
+            # FlowFiles already received stay readable, see ContentRepository
+            self.content_repository.close()
+
+    def start_in_thread(self):
+        """Runs the server in a daemon thread, returns once it is listening."""
+        started = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.start())
+            started.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self._server.wait_closed())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        started.wait()
+        return self
+
+    def stop_thread(self):
+        self._loop.call_soon_threadsafe(self.close)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._thread = None
+
+    async def _dispatch(self, flowfile: FlowFile):
+        if asyncio.iscoroutinefunction(self.handler):
+            await self.handler(flowfile)
+        else:
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, partial(self.handler, flowfile))
+
+    async def _handle_connection(self, reader, writer):
+        peer = writer.get_extra_info("peername")
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._respond(
+                        writer, HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, False
+                    )
+                    break
+
+                method = target = None
+                keep_alive, extra_headers = False, {}
+                try:
+                    method, target, version, headers = self._parse_head(head)
+                    connection = headers.get("connection", "").lower()
+                    if version == "HTTP/1.0":
+                        keep_alive = connection == "keep-alive"
+                    else:
+                        keep_alive = connection != "close"
+
+                    if headers.get("expect", "").lower() == "100-continue":
+                        writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+                    status = await self._handle_request(
+                        method, target, headers, reader, extra_headers, peer
+                    )
+                except HTTPError as e:
+                    logger.warning(
+                        "Rejected %s %s from %s: %s", method, target, peer, e
+                    )
+                    status, keep_alive = e.status, False
+
+                await self._respond(writer, status, keep_alive, extra_headers)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception:
+            logger.exception("Error while receiving FlowFiles from %s", peer)
+            await self._respond(writer, HTTPStatus.INTERNAL_SERVER_ERROR, False)
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _parse_head(head: bytes):
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ", 2)
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST)
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+        return method, target, version, headers
+
+    @staticmethod
+    async def _respond(writer, status: HTTPStatus, keep_alive, headers=None):
+        lines = ["HTTP/1.1 {} {}".format(status.value, status.phrase)]
+        lines.append("Content-Length: 0")
+        if not keep_alive:
+            lines.append("Connection: close")
+        lines.extend("{}: {}".format(k, v) for k, v in (headers or {}).items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def _handle_request(self, method, target, headers, reader, extra, peer):
+        if target.split("?", 1)[0] != self.path:
+            raise HTTPError(HTTPStatus.NOT_FOUND)
+        if method in ("HEAD", "GET"):
+            extra["Accept"] = FLOWFILE_V3_CONTENT_TYPE
+            return HTTPStatus.OK
+        if method != "POST":
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED)
+
+        chunks = self._decode_body(
+            self._iter_body(reader, headers), headers.get("content-encoding", "")
+        )
+        content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        if content_type == FLOWFILE_V3_CONTENT_TYPE:
+            decoder = FlowFileStreamDecoder(
+                self.max_content_size, content_repository=self.content_repository
+            )
+            try:
+                async for chunk in chunks:
+                    for flowfile in self._feed(decoder, chunk):
+                        await self._dispatch(flowfile)
+                self._feed(decoder, None)
+            finally:
+                decoder.discard()
+        else:
+            content = await self._read_content(chunks)
+            uuid = str(uuid4())
+            attributes = {"uuid": uuid, "path": "./", "filename": uuid}
+            if content_type:
+                attributes["mime.type"] = content_type
+            if peer:
+                attributes["restlistener.remote.source.host"] = str(peer[0])
+            attributes["restlistener.request.uri"] = target
+            await self._dispatch(FlowFile(attributes, content))
+        return HTTPStatus.OK
+
+    async def _read_content(self, chunks):
+        """Reads a whole body, moving it to the repository once it should spill."""
+        repository = self.content_repository
+        content, size, writer = bytearray(), 0, None
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > self.max_content_size:
+                    raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+                if writer is None and repository.should_spill(size):
+                    writer = repository.claim_writer()
+                    writer.write(bytes(content))
+                    content = None
+                if writer is None:
+                    content += chunk
+                else:
+                    writer.write(chunk)
+        except BaseException:
+            if writer is not None:
+                writer.discard()
+            raise
+        if writer is not None:
+            return writer.close()
+        return repository.track(bytes(content))
+
+    @staticmethod
+    def _feed(decoder: FlowFileStreamDecoder, chunk):
+        """Feeds `chunk` to the decoder, or closes it, raising its errors as HTTP ones."""
+        try:
+            if chunk is None:
+                decoder.close()
+                return []
+            return decoder.feed(chunk)
+        except UnicodeDecodeError as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(e))
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, str(e))
+        except IOError as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(e))
+
+    async def _read_exactly(self, reader, length):
+        while length > 0:
+            chunk = await reader.read(min(length, self.read_size))
+            if not chunk:
+                raise asyncio.IncompleteReadError(b"", length)
+            length -= len(chunk)
+            yield chunk
+
+    @staticmethod
+    async def _read_line(reader):
+        try:
+            return await reader.readuntil(b"\r\n")
+        except asyncio.LimitOverrunError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Chunk line too long")
+
+    async def _iter_body(self, reader, headers):
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                line = await self._read_line(reader)
+                try:
+                    size = int(line.split(b";", 1)[0], 16)
+                except ValueError:
+                    raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid chunk size")
+                if size == 0:
+                    while await self._read_line(reader) != b"\r\n":
+                        pass
+                    return
+                async for chunk in self._read_exactly(reader, size):
+                    yield chunk
+                await reader.readexactly(2)
+        else:
+            try:
+                length = int(headers.get("content-length", "0"))
+            except ValueError:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+            async for chunk in self._read_exactly(reader, length):
+                yield chunk
+
+    async def _decode_body(self, body, content_encoding):
+        content_encoding = content_encoding.lower()
+        if content_encoding in ("", "identity"):
+            async for chunk in body:
+                yield chunk
+        elif content_encoding == "gzip":
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            async for chunk in body:
+                # Bound the output of each step to protect against gzip bombs
+                while chunk:
+                    try:
+                        yield decompressor.decompress(chunk, self.read_size)
+                    except zlib.error as e:
+                        raise HTTPError(HTTPStatus.BAD_REQUEST, str(e))
+                    chunk = decompressor.unconsumed_tail
+            yield decompressor.flush()
+        else:
+            raise HTTPError(HTTPStatus.UNSUPPORTED_MEDIA_TYPE)
@@ -1,11 +1,23 @@
 """Serialization code for NiFi's FlowFile Stream v3"""
 import io
+import time
 from io import RawIOBase
+from typing import TYPE_CHECKING, List
 
+from . import metrics, provenance
 from .flowfile import FlowFile
 
+if TYPE_CHECKING:  # pragma: no cover
+    from .dedup import ContentDigestIndex
+    from .repository import ContentRepository
+
 MAX_VALUE_2_BYTES = 65535
 MAGIC_HEADER = b"NiFiFF3"
+METRICS_FLUSH_RECORDS = 256
+METRICS_FLUSH_INTERVAL = 1.0
+DEFAULT_MAX_ATTRIBUTES_SIZE = 16 * 1024 * 1024
+DEFAULT_STRING_CACHE_SIZE = 4096
+DEFAULT_STRING_CACHE_MAX_LENGTH = 256
 
 
 def write_field_length(writer, length: int):
@@ -31,8 +43,10 @@ def write_string(writer, value):
     writer.write(value_bytes)
 
 
-def read_string(reader):
+def read_string(reader, strings: "StringCache" = None):
     length = read_field_length(reader)
+    if strings is not None:
+        return strings.decode(reader.read(length))
     rv = reader.read(length).decode("utf-8")
     return rv
 
@@ -54,9 +68,15 @@ def write_attributes(writer, attributes):
         write_string(writer, value)
 
 
-def read_attributes(reader):
+def read_attributes(reader, strings: "StringCache" = None):
     num_attributes = read_field_length(reader)
     rv = {}
+    if strings is not None:
+        read, decode = reader.read, strings.decode
+        for i in range(num_attributes):
+            key = decode(read(read_field_length(reader)))
+            rv[key] = decode(read(read_field_length(reader)))
+        return rv
     for i in range(num_attributes):
         key = read_string(reader)
         value = read_string(reader)
@@ -64,6 +84,43 @@ def read_attributes(reader):
     return rv
 
 
+class StringCache(object):
+    """
+    Bounded table of decoded strings keyed by their UTF-8 encoding.
+
+    Attribute keys and many values repeat in every record of a stream, decoding them
+    through the table skips the decoding and makes every record share the same
+    `str` objects. The table is cleared once `maxsize` strings are held, so
+    one-off values such as uuids cannot grow it, while the strings that do repeat
+    are soon cached again. Strings longer than `max_length` bytes are not cached.
+    """
+
+    __slots__ = ("maxsize", "max_length", "_strings")
+
+    def __init__(
+        self,
+        maxsize=DEFAULT_STRING_CACHE_SIZE,
+        max_length=DEFAULT_STRING_CACHE_MAX_LENGTH,
+    ):
+        self.maxsize = maxsize
+        self.max_length = max_length
+        self._strings = {}
+
+    def __len__(self):
+        return len(self._strings)
+
+    def decode(self, value: bytes) -> str:
+        strings = self._strings
+        rv = strings.get(value)
+        if rv is None:
+            rv = value.decode("utf-8")
+            if len(value) <= self.max_length:
+                if len(strings) >= self.maxsize:
+                    strings.clear()
+                strings[value] = rv
+        return rv
+
+
 def read_header(reader):
     header = b""
     for i in range(len(MAGIC_HEADER)):
@@ -84,10 +141,39 @@ class FlowFileStreamIOBase(object):
     _closed = False
     _should_close_fp = False
     _fp = None
+    _metrics_direction = None
+    _metrics_counts = None
+
+    def _count(self, num_attributes, content_length):
+        """
+        Accumulates metrics locally, reporting them to the sink every
+        `METRICS_FLUSH_RECORDS` records or `METRICS_FLUSH_INTERVAL` seconds.
+        """
+        counts = self._metrics_counts
+        now = time.monotonic()
+        if counts is None:
+            counts = self._metrics_counts = [0, 0, 0, now + METRICS_FLUSH_INTERVAL]
+        counts[0] += 1
+        counts[1] += content_length
+        counts[2] += num_attributes
+        if counts[0] >= METRICS_FLUSH_RECORDS or now >= counts[3]:
+            self.flush_metrics()
+
+    def flush_metrics(self):
+        """Reports the metrics accumulated so far to the sink."""
+        counts, sink = self._metrics_counts, metrics.sink
+        direction = self._metrics_direction
+        if not counts or sink is None or direction is None:
+            return
+        sink.inc("flowfile_records_{}_total".format(direction), counts[0])
+        sink.inc("flowfile_content_bytes_{}_total".format(direction), counts[1])
+        sink.inc("flowfile_attributes_{}_total".format(direction), counts[2])
+        self._metrics_counts = None
 
     def close(self):
         if self._closed:
             return
+        self.flush_metrics()
         self._closed = True
         if self._should_close_fp:
             self._fp.close()
@@ -113,13 +199,34 @@ class FlowFileStreamIOBase(object):
 class FlowFileStreamReader(FlowFileStreamIOBase):
     """
     Reader for the NiFi FlowFiles Stream v3 format.
+
+    When a `ContentRepository` is given as `content_repository`, large contents
+    are copied to it instead of being held in memory.
+
+    Attribute strings are decoded through a `StringCache` of `string_cache_size`
+    entries shared by every record, 0 disables it.
+
+    Records read are counted in the stream metrics unless `metrics` is False, as
+    for internal files that do not hold user FlowFiles.
     """
 
     _next_header = None
     _have_read_something = False
-
-    def __init__(self, reader, **kwargs):
+    _metrics_direction = "decoded"
+
+    def __init__(
+        self,
+        reader,
+        content_repository: "ContentRepository" = None,
+        string_cache_size=DEFAULT_STRING_CACHE_SIZE,
+        metrics=True,
+        **kwargs,
+    ):
         self._fp = reader
+        if not metrics:
+            self._metrics_direction = None
+        self.content_repository = content_repository
+        self._strings = StringCache(string_cache_size) if string_cache_size else None
 
     def _has_more_data(self):
         return not (self._next_header is None and self._have_read_something)
@@ -131,15 +238,22 @@ class FlowFileStreamReader(FlowFileStreamIOBase):
         if header != MAGIC_HEADER:
             raise IOError("Not in FlowFile-v3 format")
 
-        attributes = read_attributes(self._fp)
+        attributes = read_attributes(self._fp, self._strings)
 
         content_length = read_long(self._fp)
-        content = self._fp.read(content_length)
+        if self.content_repository is None:
+            content = self._fp.read(content_length)
+        else:
+            content = self.content_repository.read(self._fp, content_length)
 
         self._next_header = read_header(self._fp)
         self._have_read_something = True
 
-        return FlowFile(attributes, content)
+        flowfile = FlowFile(attributes, content)
+
+        if metrics.sink is not None and self._metrics_direction is not None:
+            self._count(len(attributes), content_length)
+        return flowfile
 
     def __iter__(self):
         return self
@@ -148,28 +262,196 @@ class FlowFileStreamReader(FlowFileStreamIOBase):
         if self._has_more_data():
             return self.read()
         else:
+            self.flush_metrics()
             raise StopIteration
 
 
 class FlowFileStreamWriter(FlowFileStreamIOBase):
     """
-   Writer for the FlowFile Stream v3 format.
-   """
+    Writer for the FlowFile Stream v3 format.
+
+    When a `ContentDigestIndex` is given as `dedup`, FlowFiles whose content has
+    already been written are skipped.
 
-    def __init__(self, fp, **writer):
+    Records written are counted in the stream metrics unless `metrics` is False,
+    as for internal files that do not hold user FlowFiles.
+    """
+
+    _metrics_direction = "encoded"
+
+    def __init__(self, fp, dedup: "ContentDigestIndex" = None, metrics=True, **writer):
         self._fp = fp
+        self.dedup = dedup
+        if not metrics:
+            self._metrics_direction = None
 
     def write_all(self, iterable):
         for flowfile in iterable:
             self.write(flowfile)
+        self.flush_metrics()
 
     def write(self, flowfile: FlowFile):
+        if self.dedup is not None and self.dedup.add_flowfile(flowfile):
+            recorder = provenance.recorder
+            if recorder is not None:
+                recorder.record(
+                    provenance.ProvenanceEventType.DROP,
+                    provenance.flowfile_uuid(flowfile),
+                    reason="duplicate content",
+                )
+            return
+
         self._fp.write(MAGIC_HEADER)
 
-        write_attributes(self._fp, flowfile.get_attributes())
+        attributes = flowfile.get_attributes()
+        write_attributes(self._fp, attributes)
+
+        content_length = flowfile.get_content_size()
+        write_long(self._fp, content_length)
+        for chunk in flowfile.iter_content():
+            self._fp.write(chunk)
+
+        if metrics.sink is not None and self._metrics_direction is not None:
+            self._count(len(attributes), content_length)
+
+
+class _Incomplete(Exception):
+    pass
+
+
+def _take(buffer, pos: int, n: int):
+    end = pos + n
+    if end > len(buffer):
+        raise _Incomplete()
+    return buffer[pos:end], end
+
+
+def _take_field_length(buffer, pos: int):
+    value, pos = _take(buffer, pos, 2)
+    rv = int.from_bytes(value, byteorder="big")
+    if rv == MAX_VALUE_2_BYTES:
+        value, pos = _take(buffer, pos, 4)
+        rv = int.from_bytes(value, byteorder="big")
+    return rv, pos
+
+
+def _take_string(buffer, pos: int):
+    length, pos = _take_field_length(buffer, pos)
+    value, pos = _take(buffer, pos, length)
+    return value.decode("utf-8"), pos
+
+
+class FlowFileStreamDecoder(object):
+    """
+    Incremental decoder for the FlowFile Stream v3 format.
+
+    Data is pushed through `feed` as it arrives and every FlowFile completed by it
+    is returned. Only the record being decoded is buffered, its size can be bounded
+    with `max_content_size` and `max_attributes_size`.
+
+    When a `ContentRepository` is given as `content_repository`, contents it would
+    spill are written to it as they arrive instead of being buffered, and the
+    others are accounted in its memory budget.
+    """
+
+    def __init__(
+        self,
+        max_content_size=None,
+        max_attributes_size=DEFAULT_MAX_ATTRIBUTES_SIZE,
+        content_repository: "ContentRepository" = None,
+    ):
+        self.max_content_size = max_content_size
+        self.max_attributes_size = max_attributes_size
+        self.content_repository = content_repository
+        self._buffer = bytearray()
+        self._pos = 0
+        self._attributes = None
+        self._content_length = 0
+        self._claim_writer = None
+
+    def _decode_head(self) -> bool:
+        buffer, start = self._buffer, self._pos
+        try:
+            header, pos = _take(buffer, start, len(MAGIC_HEADER))
+            if header != MAGIC_HEADER:
+                raise IOError("Not in FlowFile-v3 format")
+            num_attributes, pos = _take_field_length(buffer, pos)
+            attributes = {}
+            for i in range(num_attributes):
+                key, pos = _take_string(buffer, pos)
+                attributes[key], pos = _take_string(buffer, pos)
+            content_length, pos = _take(buffer, pos, 8)
+        except _Incomplete:
+            if len(buffer) - start > self.max_attributes_size:
+                raise ValueError("FlowFile attributes exceed max_attributes_size")
+            return False
+
+        if pos - start > self.max_attributes_size:
+            raise ValueError("FlowFile attributes exceed max_attributes_size")
+        content_length = int.from_bytes(content_length, byteorder="big")
+        if self.max_content_size is not None and content_length > self.max_content_size:
+            raise ValueError("FlowFile content exceeds max_content_size")
+        self._pos = pos
+        self._attributes = attributes
+        self._content_length = content_length
+        repository = self.content_repository
+        if repository is not None and repository.should_spill(content_length):
+            self._claim_writer = repository.claim_writer()
+        return True
+
+    def _take_content(self):
+        """The content of the current record, or None while it is incomplete."""
+        buffer, start = self._buffer, self._pos
+        writer = self._claim_writer
+        if writer is not None:
+            end = min(len(buffer), start + self._content_length)
+            if end > start:
+                writer.write(bytes(buffer[start:end]))
+            self._pos = end
+            self._content_length -= end - start
+            if self._content_length:
+                return None
+            self._claim_writer = None
+            return writer.close()
+
+        end = start + self._content_length
+        if len(buffer) < end:
+            return None
+        self._pos = end
+        content = bytes(buffer[start:end])
+        if self.content_repository is not None:
+            content = self.content_repository.track(content)
+        return content
+
+    def feed(self, data) -> List[FlowFile]:
+        buffer = self._buffer
+        buffer += data
+        rv = []
+        while self._attributes is not None or self._decode_head():
+            content = self._take_content()
+            if content is None:
+                break
+            rv.append(FlowFile(self._attributes, content))
+            self._attributes = None
+        # Compact once per feed rather than once per record
+        del buffer[: self._pos]
+        self._pos = 0
+        return rv
+
+    def close(self):
+        """Raises an IOError if the data fed so far ends with a partial record."""
+        if self._buffer or self._attributes is not None:
+            self.discard()
+            raise IOError("Not in FlowFile-v3 format")
 
-        write_long(self._fp, len(flowfile.get_content()))
-        self._fp.write(flowfile.get_content())
+    def discard(self):
+        """Drops the partial record decoded so far, if any."""
+        if self._claim_writer is not None:
+            self._claim_writer.discard()
+            self._claim_writer = None
+        self._buffer = bytearray()
+        self._pos = 0
+        self._attributes = None
 
 
 def open(name, mode="r", **kwargs):
@@ -0,0 +1,5 @@
+"""Client for NiFi's raw socket Site-to-Site protocol."""
+from .client import Peer, SiteToSiteClient
+from .protocol import SiteToSiteError
+
+__all__ = ["Peer", "SiteToSiteClient", "SiteToSiteError"]
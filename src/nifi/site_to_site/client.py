@@ -0,0 +1,422 @@
+"""Client for NiFi's raw socket Site-to-Site protocol"""
+import logging
+import socket
+import threading
+import time
+from collections import namedtuple
+from typing import Iterable, List
+from uuid import uuid4
+
+from nifi.flowfile import metrics
+from nifi.flowfile.flowfile import FlowFile
+
+from .protocol import (
+    CODEC_NAME,
+    CODEC_VERSIONS,
+    MAGIC_BYTES,
+    PROTOCOL_NAME,
+    PROTOCOL_VERSIONS,
+    HandshakeProperty,
+    RequestType,
+    ResponseCode,
+    SiteToSiteError,
+    initiate_resource_negotiation,
+    read_boolean,
+    read_int,
+    read_response,
+    read_utf,
+    write_int,
+    write_packet,
+    write_response,
+    write_utf,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_COUNT = 1000
+DEFAULT_BATCH_SIZE = 16 * 1024 * 1024
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_IDLE_EXPIRATION = 30.0
+DEFAULT_PENALIZATION = 30.0
+DEFAULT_PEER_REFRESH_INTERVAL = 60.0
+BUFFER_SIZE = 64 * 1024
+
+
+class Peer(namedtuple("Peer", ["host", "port", "secure", "flowfile_count"])):
+    """A NiFi node accepting Site-to-Site connections on `port`."""
+
+    __slots__ = ()
+
+    @classmethod
+    def parse(cls, address: str) -> "Peer":
+        host, _, port = address.rpartition(":")
+        return cls(host, int(port))
+
+    @property
+    def address(self):
+        """Identifies the node across peer lists, unlike its changing flowfile count."""
+        return self.host, self.port
+
+    @property
+    def url(self):
+        return "nifi://{}:{}".format(self.host, self.port)
+
+
+Peer.__new__.__defaults__ = (False, 0)
+
+
+class PeerConnection(object):
+    """
+    A persistent socket to `peer` that completed the handshake for `port_id`.
+
+    A connection runs one request at a time, transactions on it are confirmed with
+    the CRC32 of every FlowFile sent.
+    """
+
+    def __init__(
+        self,
+        peer: Peer,
+        port_id: str = None,
+        timeout=DEFAULT_TIMEOUT,
+        batch_count=DEFAULT_BATCH_COUNT,
+        batch_size=DEFAULT_BATCH_SIZE,
+    ):
+        self.peer = peer
+        self.port_id = port_id
+        self.last_used = time.monotonic()
+        self._codec_version = None
+
+        self._socket = socket.create_connection((peer.host, peer.port), timeout)
+        try:
+            self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._reader = self._socket.makefile("rb", BUFFER_SIZE)
+            self._writer = self._socket.makefile("wb", BUFFER_SIZE)
+
+            self._writer.write(MAGIC_BYTES)
+            self.protocol_version = initiate_resource_negotiation(
+                self._reader, self._writer, PROTOCOL_NAME, PROTOCOL_VERSIONS
+            )
+            self._handshake(timeout, batch_count, batch_size)
+        except BaseException:
+            self._socket.close()
+            raise
+
+    def __repr__(self):
+        return "<nifi.site_to_site.PeerConnection {} port={}>".format(
+            self.peer.url, self.port_id
+        )
+
+    def _handshake(self, timeout, batch_count, batch_size):
+        properties = {
+            HandshakeProperty.GZIP: "false",
+            HandshakeProperty.REQUEST_EXPIRATION_MILLIS: str(int(timeout * 1000)),
+        }
+        if self.port_id is not None:
+            properties[HandshakeProperty.PORT_IDENTIFIER] = self.port_id
+        if self.protocol_version >= 5:
+            properties[HandshakeProperty.BATCH_COUNT] = str(batch_count)
+            properties[HandshakeProperty.BATCH_SIZE] = str(batch_size)
+
+        write_utf(self._writer, str(uuid4()))
+        if self.protocol_version >= 3:
+            write_utf(self._writer, self.peer.url)
+        write_int(self._writer, len(properties))
+        for key, value in properties.items():
+            write_utf(self._writer, key.value)
+            write_utf(self._writer, value)
+        self._writer.flush()
+
+        code, description = read_response(self._reader)
+        if code is not ResponseCode.PROPERTIES_OK:
+            raise SiteToSiteError(
+                "Handshake with {} failed: {} {}".format(
+                    self.peer.url, code.name, description or ""
+                ).rstrip()
+            )
+
+    def _negotiate_codec(self):
+        write_utf(self._writer, RequestType.NEGOTIATE_FLOWFILE_CODEC.value)
+        self._codec_version = initiate_resource_negotiation(
+            self._reader, self._writer, CODEC_NAME, CODEC_VERSIONS
+        )
+
+    def send_flowfiles(self, flowfiles: Iterable[FlowFile]) -> bool:
+        """
+        Sends `flowfiles` in a single transaction, returns True when the peer
+        reported its destination as full.
+        """
+        if self._codec_version is None:
+            self._negotiate_codec()
+
+        writer, reader = self._writer, self._reader
+        write_utf(writer, RequestType.SEND_FLOWFILES.value)
+        crc = 0
+        for i, flowfile in enumerate(flowfiles):
+            if i:
+                write_response(writer, ResponseCode.CONTINUE_TRANSACTION)
+            crc = write_packet(writer, flowfile, crc)
+        write_response(writer, ResponseCode.FINISH_TRANSACTION)
+        writer.flush()
+
+        code, description = read_response(reader)
+        if code is not ResponseCode.CONFIRM_TRANSACTION:
+            raise SiteToSiteError(
+                "Transaction was not confirmed by {}: {}".format(
+                    self.peer.url, code.name
+                )
+            )
+        if description != str(crc):
+            write_response(writer, ResponseCode.BAD_CHECKSUM)
+            writer.flush()
+            raise SiteToSiteError("Bad checksum from {}".format(self.peer.url))
+
+        write_response(writer, ResponseCode.CONFIRM_TRANSACTION, "")
+        writer.flush()
+        code, description = read_response(reader)
+        self.last_used = time.monotonic()
+        if code is ResponseCode.TRANSACTION_FINISHED:
+            return False
+        if code is ResponseCode.TRANSACTION_FINISHED_BUT_DESTINATION_FULL:
+            return True
+        raise SiteToSiteError(
+            "Transaction was not finished by {}: {}".format(self.peer.url, code.name)
+        )
+
+    def get_peers(self) -> List[Peer]:
+        write_utf(self._writer, RequestType.REQUEST_PEER_LIST.value)
+        self._writer.flush()
+        peers = []
+        for _ in range(read_int(self._reader)):
+            host = read_utf(self._reader)
+            port = read_int(self._reader)
+            secure = read_boolean(self._reader)
+            peers.append(Peer(host, port, secure, read_int(self._reader)))
+        self.last_used = time.monotonic()
+        return peers
+
+    def close(self, shutdown=True):
+        if shutdown:
+            try:
+                write_utf(self._writer, RequestType.SHUTDOWN.value)
+                self._writer.flush()
+            except (OSError, ValueError):
+                pass
+        for f in (self._writer, self._reader, self._socket):
+            try:
+                f.close()
+            except OSError:
+                pass
+
+
+class ConnectionPool(object):
+    """
+    Keeps up to `max_idle` handshaken connections per peer address for reuse,
+    connections idle for longer than `idle_expiration` seconds are closed instead.
+    """
+
+    def __init__(self, connect, max_idle=4, idle_expiration=DEFAULT_IDLE_EXPIRATION):
+        self.connect = connect
+        self.max_idle = max_idle
+        self.idle_expiration = idle_expiration
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, peer: Peer) -> PeerConnection:
+        expired = []
+        connection = None
+        with self._lock:
+            idle = self._idle.get(peer.address, [])
+            while idle:
+                candidate = idle.pop()
+                if time.monotonic() - candidate.last_used < self.idle_expiration:
+                    connection = candidate
+                    break
+                expired.append(candidate)
+        for candidate in expired:
+            candidate.close()
+        return connection or self.connect(peer)
+
+    def release(self, connection: PeerConnection):
+        with self._lock:
+            idle = self._idle.setdefault(connection.peer.address, [])
+            if len(idle) < self.max_idle:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def discard(self, connection: PeerConnection):
+        connection.close(shutdown=False)
+
+    def retain(self, peers: Iterable[Peer]):
+        """Closes the idle connections to any peer not in `peers`."""
+        addresses = {peer.address for peer in peers}
+        with self._lock:
+            removed = [a for a in self._idle if a not in addresses]
+            connections = [c for a in removed for c in self._idle.pop(a)]
+        for connection in connections:
+            connection.close()
+
+    def close(self):
+        self.retain(())
+
+
+class SiteToSiteClient(object):
+    """
+    Sends FlowFiles to a NiFi input port over the raw socket Site-to-Site protocol.
+
+    `send` groups FlowFiles into transactions of up to `batch_count` FlowFiles or
+    `batch_size` bytes of content, each confirmed by a single checksum round trip.
+    Transactions are spread round robin over the cluster's peers, whose list is
+    refreshed every `peer_refresh_interval` seconds, and run over pooled persistent
+    connections. A peer that fails or reports its destination as full is skipped
+    for `penalization` seconds.
+
+    Usage example.
+
+    client = SiteToSiteClient(["nifi-0:10000", "nifi-1:10000"], port_id)
+    client.send([FlowFile(dict(filename="a"), b"Hello World!")])
+    client.close()
+    """
+
+    def __init__(
+        self,
+        peers: Iterable,
+        port_id: str,
+        batch_count=DEFAULT_BATCH_COUNT,
+        batch_size=DEFAULT_BATCH_SIZE,
+        timeout=DEFAULT_TIMEOUT,
+        max_idle_connections=4,
+        idle_expiration=DEFAULT_IDLE_EXPIRATION,
+        penalization=DEFAULT_PENALIZATION,
+        peer_refresh_interval=DEFAULT_PEER_REFRESH_INTERVAL,
+    ):
+        self.peers = [Peer.parse(p) if isinstance(p, str) else p for p in peers]
+        if not self.peers:
+            raise ValueError("At least one peer is required")
+        self.port_id = port_id
+        self.batch_count = batch_count
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.penalization = penalization
+        self.peer_refresh_interval = peer_refresh_interval
+        self.pool = ConnectionPool(self._connect, max_idle_connections, idle_expiration)
+
+        self._lock = threading.Lock()
+        self._next_peer = 0
+        self._penalized = {}
+        self._peers_refreshed = None
+
+    def _connect(self, peer: Peer) -> PeerConnection:
+        return PeerConnection(
+            peer, self.port_id, self.timeout, self.batch_count, self.batch_size
+        )
+
+    def refresh_peers(self) -> List[Peer]:
+        """Replaces `peers` with the peer list reported by the first reachable peer."""
+        self._peers_refreshed = time.monotonic()
+        for peer in list(self.peers):
+            try:
+                connection = self.pool.acquire(peer)
+            except OSError:
+                continue
+            try:
+                peers = connection.get_peers()
+            except OSError:
+                self.pool.discard(connection)
+                continue
+            self.pool.release(connection)
+            if peers:
+                addresses = {peer.address for peer in peers}
+                with self._lock:
+                    self.peers = peers
+                    for address in list(self._penalized):
+                        if address not in addresses:
+                            del self._penalized[address]
+                self.pool.retain(peers)
+                break
+        return self.peers
+
+    def _select_peer(self) -> Peer:
+        interval, refreshed = self.peer_refresh_interval, self._peers_refreshed
+        if interval is not None:
+            if refreshed is None or time.monotonic() - refreshed > interval:
+                self.refresh_peers()
+
+        with self._lock:
+            now = time.monotonic()
+            peers = self.peers
+            for i in range(len(peers)):
+                peer = peers[(self._next_peer + i) % len(peers)]
+                if self._penalized.get(peer.address, 0) <= now:
+                    self._next_peer = (self._next_peer + i + 1) % len(peers)
+                    return peer
+            # Every peer is penalized, use the one whose penalty ends first
+            return min(peers, key=lambda p: self._penalized.get(p.address, 0))
+
+    def penalize(self, peer: Peer):
+        with self._lock:
+            self._penalized[peer.address] = time.monotonic() + self.penalization
+
+    def send_transaction(self, flowfiles: List[FlowFile]) -> Peer:
+        """
+        Sends `flowfiles` in a single transaction, retrying on the next peer when a
+        peer fails. Returns the peer that accepted them.
+        """
+        sink = metrics.sink
+        start = time.perf_counter()
+        error = None
+        for _ in range(len(self.peers)):
+            peer = self._select_peer()
+            try:
+                connection = self.pool.acquire(peer)
+            except OSError as e:
+                logger.warning("Unable to connect to {}: {}".format(peer.url, e))
+                self.penalize(peer)
+                error = e
+                continue
+            try:
+                destination_full = connection.send_flowfiles(flowfiles)
+            except OSError as e:
+                logger.warning("Transaction with {} failed: {}".format(peer.url, e))
+                self.pool.discard(connection)
+                self.penalize(peer)
+                error = e
+                continue
+            self.pool.release(connection)
+            if destination_full:
+                self.penalize(peer)
+
+            if sink is not None:
+                sink.observe("nifi_s2s_send_seconds", time.perf_counter() - start)
+                sink.inc("nifi_s2s_flowfiles_sent_total", len(flowfiles))
+            return peer
+
+        if sink is not None:
+            sink.inc("nifi_s2s_send_failures_total")
+        raise error
+
+    def send(self, flowfiles: Iterable[FlowFile]) -> int:
+        """Sends `flowfiles` in batched transactions, returns how many were sent."""
+        count = 0
+        batch, size = [], 0
+        for flowfile in flowfiles:
+            batch.append(flowfile)
+            size += flowfile.get_content_size()
+            if len(batch) >= self.batch_count or size >= self.batch_size:
+                self.send_transaction(batch)
+                count += len(batch)
+                batch, size = [], 0
+        if batch:
+            self.send_transaction(batch)
+            count += len(batch)
+        return count
+
+    def close(self):
+        self.pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
@@ -0,0 +1,250 @@
+"""Wire format of NiFi's raw socket Site-to-Site protocol.
+
+A connection starts with the `MAGIC_BYTES`, negotiates the `SocketFlowFileProtocol`
+resource version and performs the handshake, after which requests are framed with
+Java's `DataOutputStream` encodings. FlowFiles are encoded by the
+`StandardFlowFileCodec`: an int attribute count, int length-prefixed UTF-8 keys and
+values, a long content size and the content.
+"""
+import struct
+import zlib
+from enum import Enum
+
+MAGIC_BYTES = b"NiFi"
+RESPONSE_MAGIC = b"RC"
+
+PROTOCOL_NAME = "SocketFlowFileProtocol"
+PROTOCOL_VERSIONS = (6, 5, 4, 3, 2, 1)
+CODEC_NAME = "StandardFlowFileCodec"
+CODEC_VERSIONS = (1,)
+
+RESOURCE_OK = 20
+DIFFERENT_RESOURCE_VERSION = 21
+ABORT = 255
+
+_INT = struct.Struct(">i")
+_UINT = struct.Struct(">I")
+_LONG = struct.Struct(">q")
+_USHORT = struct.Struct(">H")
+
+
+class SiteToSiteError(IOError):
+    pass
+
+
+class ResponseCode(Enum):
+    """
+    ref: org.apache.nifi.remote.protocol.ResponseCode, the second value tells
+    whether the code is followed by a description.
+    """
+
+    RESERVED = (0, False)
+    PROPERTIES_OK = (1, False)
+    UNKNOWN_PROPERTY_NAME = (230, True)
+    ILLEGAL_PROPERTY_VALUE = (231, True)
+    MISSING_PROPERTY = (232, True)
+    CONTINUE_TRANSACTION = (10, False)
+    FINISH_TRANSACTION = (11, False)
+    CONFIRM_TRANSACTION = (12, True)
+    TRANSACTION_FINISHED = (13, False)
+    TRANSACTION_FINISHED_BUT_DESTINATION_FULL = (14, False)
+    CANCEL_TRANSACTION = (15, True)
+    BAD_CHECKSUM = (19, False)
+    MORE_DATA = (20, False)
+    NO_MORE_DATA = (21, False)
+    UNKNOWN_PORT = (200, False)
+    PORT_NOT_IN_VALID_STATE = (201, True)
+    PORTS_DESTINATION_FULL = (202, False)
+    UNAUTHORIZED = (240, True)
+    ABORT = (250, True)
+    UNRECOGNIZED_RESPONSE_CODE = (254, False)
+    END_OF_STREAM = (255, False)
+
+    def __init__(self, code, has_description):
+        self.code = code
+        self.has_description = has_description
+
+
+_RESPONSE_CODES = {rc.code: rc for rc in ResponseCode}
+
+
+class RequestType(Enum):
+    NEGOTIATE_FLOWFILE_CODEC = "NEGOTIATE_FLOWFILE_CODEC"
+    REQUEST_PEER_LIST = "REQUEST_PEER_LIST"
+    SEND_FLOWFILES = "SEND_FLOWFILES"
+    RECEIVE_FLOWFILES = "RECEIVE_FLOWFILES"
+    SHUTDOWN = "SHUTDOWN"
+
+
+class HandshakeProperty(Enum):
+    GZIP = "GZIP"
+    PORT_IDENTIFIER = "PORT_IDENTIFIER"
+    REQUEST_EXPIRATION_MILLIS = "REQUEST_EXPIRATION_MILLIS"
+    BATCH_COUNT = "BATCH_COUNT"
+    BATCH_SIZE = "BATCH_SIZE"
+    BATCH_DURATION = "BATCH_DURATION"
+
+
+def read_fully(reader, length: int) -> bytes:
+    rv = reader.read(length)
+    if len(rv) != length:
+        raise SiteToSiteError("Unexpected end of stream")
+    return rv
+
+
+def read_byte(reader) -> int:
+    return read_fully(reader, 1)[0]
+
+
+def write_int(writer, value: int):
+    writer.write(_INT.pack(value))
+
+
+def read_int(reader) -> int:
+    return _INT.unpack(read_fully(reader, 4))[0]
+
+
+def write_long(writer, value: int):
+    writer.write(_LONG.pack(value))
+
+
+def read_long(reader) -> int:
+    return _LONG.unpack(read_fully(reader, 8))[0]
+
+
+def write_boolean(writer, value: bool):
+    writer.write(b"\x01" if value else b"\x00")
+
+
+def read_boolean(reader) -> bool:
+    return read_byte(reader) != 0
+
+
+def write_utf(writer, value: str):
+    """Java's `DataOutput.writeUTF`, a short length and modified UTF-8."""
+    if any(ord(c) > 0xFFFF for c in value):
+        # Characters outside the BMP are written as encoded surrogate pairs
+        data = value.encode("utf-16-be", "surrogatepass")
+        value = "".join(map(chr, struct.unpack(">{}H".format(len(data) // 2), data)))
+    data = value.encode("utf-8", "surrogatepass").replace(b"\x00", b"\xc0\x80")
+    if len(data) > 0xFFFF:
+        raise ValueError("String is too long for DataOutput.writeUTF")
+    writer.write(_USHORT.pack(len(data)) + data)
+
+
+def read_utf(reader) -> str:
+    (length,) = _USHORT.unpack(read_fully(reader, 2))
+    data = read_fully(reader, length).replace(b"\xc0\x80", b"\x00")
+    rv = data.decode("utf-8", "surrogatepass")
+    if any(0xD800 <= ord(c) <= 0xDFFF for c in rv):
+        rv = rv.encode("utf-16-be", "surrogatepass").decode("utf-16-be")
+    return rv
+
+
+def write_response(writer, code: ResponseCode, description: str = None):
+    writer.write(RESPONSE_MAGIC + bytes((code.code,)))
+    if code.has_description:
+        write_utf(writer, description or "")
+
+
+def read_response(reader):
+    """Returns the (ResponseCode, description) sent by the peer."""
+    if read_fully(reader, 2) != RESPONSE_MAGIC:
+        raise SiteToSiteError("Invalid response from peer")
+    value = read_byte(reader)
+    code = _RESPONSE_CODES.get(value)
+    if code is None:
+        raise SiteToSiteError("Unrecognized response code {}".format(value))
+    description = read_utf(reader) if code.has_description else None
+    return code, description
+
+
+def initiate_resource_negotiation(reader, writer, name: str, versions) -> int:
+    """Agrees on a version of resource `name`, preferring the first of `versions`."""
+    version = versions[0]
+    while True:
+        write_utf(writer, name)
+        write_int(writer, version)
+        writer.flush()
+
+        status = read_byte(reader)
+        if status == RESOURCE_OK:
+            return version
+        if status == DIFFERENT_RESOURCE_VERSION:
+            preferred = read_int(reader)
+            candidates = [v for v in versions if v <= preferred]
+            if not candidates:
+                raise SiteToSiteError(
+                    "Peer requires {} version {}".format(name, preferred)
+                )
+            version = candidates[0]
+        elif status == ABORT:
+            raise SiteToSiteError(
+                "Peer aborted {} negotiation: {}".format(name, read_utf(reader))
+            )
+        else:
+            raise SiteToSiteError("Invalid negotiation status {}".format(status))
+
+
+def respond_resource_negotiation(reader, writer, name: str, versions):
+    """Server side of `initiate_resource_negotiation`, returns the agreed version."""
+    while True:
+        requested_name = read_utf(reader)
+        version = read_int(reader)
+        if requested_name != name:
+            writer.write(bytes((ABORT,)))
+            write_utf(writer, "No resource named {}".format(requested_name))
+            writer.flush()
+            raise SiteToSiteError("Unknown resource {}".format(requested_name))
+        if version in versions:
+            writer.write(bytes((RESOURCE_OK,)))
+            writer.flush()
+            return version
+        candidates = [v for v in versions if v < version]
+        writer.write(bytes((DIFFERENT_RESOURCE_VERSION,)))
+        write_int(writer, candidates[0] if candidates else versions[-1])
+        writer.flush()
+
+
+def encode_attributes(attributes) -> bytes:
+    buffer = bytearray(_INT.pack(len(attributes)))
+    for key, value in attributes.items():
+        for s in (key, value):
+            data = s.encode("utf-8")
+            buffer += _UINT.pack(len(data))
+            buffer += data
+    return bytes(buffer)
+
+
+def write_packet(writer, flowfile, crc: int = 0) -> int:
+    """
+    Encodes `flowfile` with the StandardFlowFileCodec, returns the CRC32 of the
+    encoded bytes continuing from `crc`.
+    """
+    head = encode_attributes(flowfile.get_attributes())
+    head += _LONG.pack(flowfile.get_content_size())
+    writer.write(head)
+    crc = zlib.crc32(head, crc)
+    for chunk in flowfile.iter_content():
+        writer.write(chunk)
+        crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+def read_packet(reader, crc: int = 0):
+    """Decodes a StandardFlowFileCodec packet, returns (attributes, content, crc)."""
+    data = read_fully(reader, 4)
+    crc = zlib.crc32(data, crc)
+    attributes = {}
+    for _ in range(_INT.unpack(data)[0]):
+        pair = []
+        for _ in range(2):
+            length = read_fully(reader, 4)
+            value = read_fully(reader, _UINT.unpack(length)[0])
+            crc = zlib.crc32(value, zlib.crc32(length, crc))
+            pair.append(value.decode("utf-8"))
+        attributes[pair[0]] = pair[1]
+    data = read_fully(reader, 8)
+    content = read_fully(reader, _LONG.unpack(data)[0])
+    crc = zlib.crc32(content, zlib.crc32(data, crc))
+    return attributes, content, crc
@@ -0,0 +1,183 @@
+"""Minimal Site-to-Site peer, a local stand-in for NiFi in tests and benchmarks"""
+import logging
+import socketserver
+import threading
+from typing import List
+
+from nifi.flowfile.flowfile import FlowFile
+
+from .client import Peer
+from .protocol import (
+    CODEC_NAME,
+    CODEC_VERSIONS,
+    MAGIC_BYTES,
+    PROTOCOL_NAME,
+    PROTOCOL_VERSIONS,
+    RequestType,
+    ResponseCode,
+    SiteToSiteError,
+    read_fully,
+    read_int,
+    read_packet,
+    read_response,
+    read_utf,
+    respond_resource_negotiation,
+    write_boolean,
+    write_int,
+    write_response,
+    write_utf,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class _ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SiteToSiteServer(object):
+    """
+    Accepts FlowFiles sent to its input ports over the raw socket Site-to-Site
+    protocol.
+
+    `handler(port_id, flowfiles)` is called with the FlowFiles of every confirmed
+    transaction before it is reported as finished. Only `ports` are accepted when
+    given, and `peers` is reported as the cluster's peer list (this server alone by
+    default). With `destination_full` every transaction reports a full destination.
+    """
+
+    def __init__(
+        self,
+        handler,
+        host="127.0.0.1",
+        port=0,
+        ports=None,
+        peers: List[Peer] = None,
+        protocol_versions=PROTOCOL_VERSIONS,
+        destination_full=False,
+    ):
+        self.handler = handler
+        self.ports = ports
+        self.peers = peers
+        self.protocol_versions = protocol_versions
+        self.destination_full = destination_full
+        self.connection_count = 0
+        self.transaction_count = 0
+        self._lock = threading.Lock()
+
+        server = self
+
+        class RequestHandler(socketserver.StreamRequestHandler):
+            rbufsize = 64 * 1024
+            wbufsize = 64 * 1024
+
+            def handle(self):
+                try:
+                    server._handle_connection(self.rfile, self.wfile)
+                except (OSError, SiteToSiteError) as e:
+                    logger.debug("Site-to-Site connection closed: %s", e)
+
+        self._server = _ThreadingTCPServer((host, port), RequestHandler)
+        self.host, self.port = self._server.server_address[:2]
+        self._thread = None
+
+    @property
+    def peer(self) -> Peer:
+        return Peer(self.host, self.port)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def _handle_connection(self, reader, writer):
+        if read_fully(reader, len(MAGIC_BYTES)) != MAGIC_BYTES:
+            raise SiteToSiteError("Not a Site-to-Site connection")
+        version = respond_resource_negotiation(
+            reader, writer, PROTOCOL_NAME, self.protocol_versions
+        )
+        with self._lock:
+            self.connection_count += 1
+
+        read_utf(reader)  # communications identifier
+        if version >= 3:
+            read_utf(reader)  # transit URI
+        properties = {}
+        for _ in range(read_int(reader)):
+            key = read_utf(reader)
+            properties[key] = read_utf(reader)
+
+        port_id = properties.get("PORT_IDENTIFIER")
+        if port_id is not None and self.ports is not None and port_id not in self.ports:
+            write_response(writer, ResponseCode.UNKNOWN_PORT)
+            writer.flush()
+            return
+        write_response(writer, ResponseCode.PROPERTIES_OK)
+        writer.flush()
+
+        while True:
+            try:
+                request = RequestType(read_utf(reader))
+            except SiteToSiteError:
+                return
+            if request is RequestType.NEGOTIATE_FLOWFILE_CODEC:
+                respond_resource_negotiation(reader, writer, CODEC_NAME, CODEC_VERSIONS)
+            elif request is RequestType.REQUEST_PEER_LIST:
+                self._send_peer_list(writer)
+            elif request is RequestType.SEND_FLOWFILES:
+                self._receive_flowfiles(reader, writer, port_id)
+            else:
+                return
+
+    def _send_peer_list(self, writer):
+        peers = self.peers if self.peers is not None else [self.peer]
+        write_int(writer, len(peers))
+        for peer in peers:
+            write_utf(writer, peer.host)
+            write_int(writer, peer.port)
+            write_boolean(writer, peer.secure)
+            write_int(writer, peer.flowfile_count)
+        writer.flush()
+
+    def _receive_flowfiles(self, reader, writer, port_id):
+        flowfiles, crc = [], 0
+        while True:
+            attributes, content, crc = read_packet(reader, crc)
+            flowfiles.append(FlowFile(attributes, content))
+            code, _ = read_response(reader)
+            if code is ResponseCode.FINISH_TRANSACTION:
+                break
+            if code is not ResponseCode.CONTINUE_TRANSACTION:
+                raise SiteToSiteError("Unexpected {} in transaction".format(code.name))
+
+        write_response(writer, ResponseCode.CONFIRM_TRANSACTION, str(crc))
+        writer.flush()
+        code, _ = read_response(reader)
+        if code is not ResponseCode.CONFIRM_TRANSACTION:
+            return
+
+        self.handler(port_id, flowfiles)
+        with self._lock:
+            self.transaction_count += 1
+        if self.destination_full:
+            write_response(
+                writer, ResponseCode.TRANSACTION_FINISHED_BUT_DESTINATION_FULL
+            )
+        else:
+            write_response(writer, ResponseCode.TRANSACTION_FINISHED)
+        writer.flush()
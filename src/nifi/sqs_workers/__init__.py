@@ -1,3 +1,23 @@
-from .queue import NiFiQueue
+from importlib import import_module
 
-__all__ = ["NiFiQueue"]
+__all__ = ["NiFiQueue", "JournaledSender", "ClientPool", "MultiQueueConsumer"]
+
+# sqs-workers (and boto3 through it) is only imported once a queue is used.
+_lazy_attributes = {
+    "NiFiQueue": ".queue",
+    "JournaledSender": ".sender",
+    "ClientPool": ".pool",
+    "MultiQueueConsumer": ".consumer",
+}
+
+
+def __getattr__(name):
+    if name not in _lazy_attributes:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(import_module(_lazy_attributes[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_attributes))
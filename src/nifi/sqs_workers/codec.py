@@ -1,6 +1,6 @@
 import base64
 import io
-from typing import List
+from typing import Iterator, List
 
 from nifi.flowfile import FlowFile
 from sqs_workers.codecs import CONTENT_TYPES_CODECS, get_codec
@@ -20,11 +20,13 @@ class FlowFileStreamCodec(object):
 
     @staticmethod
     def deserialize(serialized) -> List[FlowFile]:
+        return list(FlowFileStreamCodec.iter_deserialize(serialized))
+
+    @staticmethod
+    def iter_deserialize(serialized) -> Iterator[FlowFile]:
         ff3_data = base64.b64decode(serialized.encode("utf-8"))
         with io.BytesIO(ff3_data) as bytes_in:
-            reader = FlowFileStreamReader(bytes_in)
-            messages = list(reader)
-        return messages
+            yield from FlowFileStreamReader(bytes_in)
 
 
 FLOWFILE_CODEC_TYPE = "flowfile-v3"
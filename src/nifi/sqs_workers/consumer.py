@@ -0,0 +1,109 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Iterable
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IDLE_BACKOFF = 0.5
+DEFAULT_MAX_IDLE_BACKOFF = 10.0
+
+
+class MultiQueueConsumer(object):
+    """Serves many queues from one process with a pool of worker threads.
+
+    Queues take turns: a worker processes a single batch of the queue that has been
+    ready the longest and then puts it back at the end of the line, so a busy queue
+    cannot starve the others. A queue that returned no messages is polled again
+    after `idle_backoff` seconds, doubling up to `max_idle_backoff` while it stays
+    empty. No queue is ever processed by two workers at once.
+
+    Usage example.
+
+    consumer = MultiQueueConsumer([sqs.queue(name, NiFiQueue) for name in names])
+    consumer.start()
+    ...
+    consumer.stop()
+    """
+
+    def __init__(
+        self,
+        queues: Iterable,
+        workers=4,
+        wait_seconds=0,
+        idle_backoff=DEFAULT_IDLE_BACKOFF,
+        max_idle_backoff=DEFAULT_MAX_IDLE_BACKOFF,
+    ):
+        self.queues = list(queues)
+        self.workers = workers
+        self.wait_seconds = wait_seconds
+        self.idle_backoff = idle_backoff
+        self.max_idle_backoff = max_idle_backoff
+        self.processed = {queue.name: 0 for queue in self.queues}
+
+        self._counter = itertools.count()
+        self._ready = [(0.0, next(self._counter), queue, 0.0) for queue in self.queues]
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self._threads = []
+
+    def _take(self):
+        with self._condition:
+            while not self._stopped.is_set():
+                now = time.monotonic()
+                if self._ready and self._ready[0][0] <= now:
+                    _, _, queue, backoff = heapq.heappop(self._ready)
+                    return queue, backoff
+                timeout = self._ready[0][0] - now if self._ready else None
+                self._condition.wait(timeout)
+        return None, None
+
+    def _put(self, queue, backoff, ready_at):
+        with self._condition:
+            entry = (ready_at, next(self._counter), queue, backoff)
+            heapq.heappush(self._ready, entry)
+            self._condition.notify()
+
+    def process_turn(self, queue, backoff=0.0):
+        """Processes one batch of `queue` and schedules its next turn."""
+        count = 0
+        try:
+            count = queue.process_batch(wait_seconds=self.wait_seconds).total_count()
+        except Exception:
+            logger.exception("Error while consuming nifi+sqs://{}".format(queue.name))
+        self.processed[queue.name] += count
+
+        if count:
+            # At the end of the line, behind any idle queue whose back-off has ended
+            backoff, ready_at = 0.0, time.monotonic()
+        else:
+            backoff = min(max(2 * backoff, self.idle_backoff), self.max_idle_backoff)
+            ready_at = time.monotonic() + backoff
+        self._put(queue, backoff, ready_at)
+        return count
+
+    def run(self):
+        while True:
+            queue, backoff = self._take()
+            if queue is None:
+                return
+            self.process_turn(queue, backoff)
+
+    def start(self):
+        self._stopped.clear()
+        self._threads = [
+            threading.Thread(target=self.run, daemon=True) for _ in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """Stops the workers once their current batch is processed."""
+        self._stopped.set()
+        with self._condition:
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
@@ -0,0 +1,88 @@
+import threading
+import time
+
+DEFAULT_TTL = 300.0
+
+_pools_lock = threading.Lock()
+
+
+def get_client_pool(env) -> "ClientPool":
+    """Returns the ClientPool shared by every NiFiQueue of `env`."""
+    pool = getattr(env, "_nifi_client_pool", None)
+    if pool is None:
+        with _pools_lock:
+            pool = getattr(env, "_nifi_client_pool", None)
+            if pool is None:
+                pool = ClientPool(env)
+                env._nifi_client_pool = pool
+    return pool
+
+
+class ClientPool(object):
+    """
+    Thread-local boto3 SQS resources and resolved queues for an `SQSEnv`.
+
+    boto3 resources are not thread safe, so each thread gets its own, created from
+    the environment's session with the region, endpoint and configuration of the
+    environment's resource. Queues resolved by name are cached per thread for
+    `ttl` seconds, or until invalidated, so that queue URLs are looked up once per
+    thread and TTL instead of on every send.
+    """
+
+    def __init__(self, env, ttl=DEFAULT_TTL):
+        self.env = env
+        self.ttl = ttl
+        self._local = threading.local()
+        # boto3 sessions are not thread safe either
+        self._session_lock = threading.Lock()
+        self._generation = 0
+
+    def _create_resource(self):
+        resource = self.env.sqs_resource
+        client = getattr(getattr(resource, "meta", None), "client", None)
+        if client is None:
+            # Not a boto3 resource, e.g. sqs_workers' MemorySession
+            return resource
+        # Like the environment's resource, which may have been given explicitly
+        meta = client.meta
+        kwargs = dict(
+            region_name=meta.region_name,
+            endpoint_url=meta.endpoint_url,
+            config=meta.config,
+        )
+        with self._session_lock:
+            return self.env.session.resource("sqs", **kwargs)
+
+    @property
+    def resource(self):
+        """The SQS resource of the calling thread."""
+        local = self._local
+        resource = getattr(local, "resource", None)
+        if resource is None:
+            resource = local.resource = self._create_resource()
+            local.queues = {}
+        return resource
+
+    def get_queue(self, sqs_queue_name: str):
+        """The SQS queue named `sqs_queue_name`, as seen by the calling thread."""
+        resource = self.resource
+        queues = self._local.queues
+        cached = queues.get(sqs_queue_name)
+        now = time.monotonic()
+        if cached is not None:
+            queue, expires, generation = cached
+            if now < expires and generation == self._generation:
+                return queue
+        queue = resource.get_queue_by_name(QueueName=sqs_queue_name)
+        queues[sqs_queue_name] = (queue, now + self.ttl, self._generation)
+        return queue
+
+    def invalidate(self, sqs_queue_name: str = None):
+        """
+        Drops `sqs_queue_name` from the calling thread's cache, or every queue of
+        every thread when no name is given.
+        """
+        if sqs_queue_name is None:
+            self._generation += 1
+        else:
+            getattr(self._local, "queues", {}).pop(sqs_queue_name, None)
@@ -1,7 +1,10 @@
 import logging
+import time
 from functools import partial
 
-from nifi.flowfile import FlowFile
+import attr
+from nifi.flowfile import FlowFile, metrics, provenance
+from nifi.flowfile.routing import RoutingTable
 from sqs_workers.processors import Processor, get_job_content_type
 
 from .queue import NiFiQueue
@@ -32,10 +35,29 @@ class NiFiProcessor(Processor):
             extra["content_type"] = content_type
             codec = get_codec(content_type)
 
+            start = time.perf_counter()
             flowfiles = codec.deserialize(message.body)
+            sink = metrics.sink
+            if sink is not None:
+                sink.observe(
+                    "nifi_sqs_deserialize_seconds",
+                    time.perf_counter() - start,
+                    queue=self.queue.name,
+                    port=self.job_name,
+                )
+            recorder = provenance.recorder
+            if recorder is not None:
+                transit_uri = "nifi+sqs://{queue_name}/{port_id}".format(**extra)
+                for flowfile in flowfiles:
+                    recorder.record(
+                        provenance.ProvenanceEventType.RECEIVE,
+                        provenance.flowfile_uuid(flowfile),
+                        transit_uri=transit_uri,
+                    )
 
-            for flowfile in flowfiles:
-                self.process_flowfile(flowfile, success_callback, failure_callback)
+            self.process_flowfiles(
+                message, flowfiles, success_callback, failure_callback
+            )
 
         except Exception:
             logger.exception(
@@ -62,10 +84,63 @@ class NiFiProcessor(Processor):
         queue_name = (attrs.get("ResponseQueue") or {}).get("StringValue")
         return self.queue.env.queue(queue_name, NiFiQueue)
 
-    def process_flowfile(self, flowfile: FlowFile, success, failure):
+    def process_flowfiles(self, message, flowfiles, success, failure):
+        for flowfile in flowfiles:
+            self.process_flowfile(flowfile, success, failure)
+
+    def process_flowfile(self, flowfile: FlowFile, success, failure, fn=None):
+        start = time.perf_counter()
+        outcome = "success"
+        recorder = provenance.recorder
+        children = [] if recorder is not None else None
         try:
-            rvs = self.fn(flowfile)
+            rvs = (fn or self.fn)(flowfile)
             for rv in rvs or [flowfile]:
                 success(rv)
+                if children is not None:
+                    children.append(provenance.flowfile_uuid(rv))
         except Exception:
+            outcome = "failure"
             failure(flowfile)
+        if children is not None and len(children) > 1:
+            recorder.record(
+                provenance.ProvenanceEventType.FORK,
+                provenance.flowfile_uuid(flowfile),
+                children=children,
+            )
+
+        sink = metrics.sink
+        if sink is not None:
+            labels = dict(queue=self.queue.name, port=self.job_name)
+            sink.observe(
+                "nifi_sqs_process_seconds", time.perf_counter() - start, **labels
+            )
+            sink.inc("nifi_sqs_flowfiles_processed_total", outcome=outcome, **labels)
+
+
+@attr.s
+class RoutingProcessor(NiFiProcessor):
+    """A NiFiProcessor dispatching FlowFiles by their attributes, like RouteOnAttribute.
+
+    Each FlowFile is processed by every function whose rule in `table` matches it,
+    FlowFiles matching no rule are sent to the `unmatched` response port.
+    """
+
+    table = attr.ib(factory=RoutingTable)  # type: RoutingTable
+
+    def process_flowfiles(self, message, flowfiles, success, failure):
+        unmatched = self.get_response_callback(message, "unmatched")
+        sink = metrics.sink
+        for flowfile in flowfiles:
+            fns = self.table.route(flowfile)
+            if not fns:
+                unmatched(flowfile)
+                if sink is not None:
+                    sink.inc(
+                        "nifi_sqs_flowfiles_processed_total",
+                        outcome="unmatched",
+                        queue=self.queue.name,
+                        port=self.job_name,
+                    )
+            for fn in fns:
+                self.process_flowfile(flowfile, success, failure, fn)
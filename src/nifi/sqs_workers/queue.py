@@ -1,14 +1,19 @@
 import logging
+import time
 import warnings
 
-from typing import Dict
+from typing import TYPE_CHECKING, List
 
 import attr
-from nifi.flowfile import FlowFile
+from nifi.flowfile import FlowFile, metrics, provenance
 from sqs_workers.queue import GenericQueue
-from sqs_workers.processors import Processor
 
 from .codec import get_codec, FLOWFILE_CODEC_TYPE
+from .pool import get_client_pool
+
+if TYPE_CHECKING:  # pragma: no cover
+    from typing import Dict
+    from sqs_workers.processors import Processor
 
 logger = logging.getLogger(__name__)
 
@@ -30,7 +35,7 @@ class NiFiQueue(GenericQueue):
     foo.add_flowfile("test", ff)
     """
 
-    processors = attr.ib(factory=dict)  # type: Dict[str, Processor]
+    processors: "Dict[str, Processor]" = attr.ib(factory=dict)
 
     def processor(self, port_id):
         def fn(processor):
@@ -50,7 +55,42 @@ class NiFiQueue(GenericQueue):
             "Connect nifi+sqs://{queue_name}/{port_id} to {processor}".format(**extra),
             extra=extra,
         )
-        self.processors[port_id] = NiFiProcessor(self, fn=processor)
+        self.processors[port_id] = NiFiProcessor(self, fn=processor, job_name=port_id)
+
+    def route(self, port_id, *predicates):
+        def fn(processor):
+            self.connect_route(processor, port_id, *predicates)
+            return processor
+
+        return fn
+
+    def connect_route(self, processor, port_id, *predicates):
+        """
+        Connects `processor` to the FlowFiles of `port_id` matching every predicate of
+        `nifi.flowfile.routing`, several processors may receive the same FlowFile.
+        """
+        from .processor import RoutingProcessor
+
+        extra = {
+            "queue_name": self.name,
+            "port_id": port_id,
+            "processor": "{}:{}".format(processor.__module__, processor.__name__),
+        }
+        logger.debug(
+            "Route nifi+sqs://{queue_name}/{port_id} to {processor}".format(**extra),
+            extra=extra,
+        )
+        router = self.processors.get(port_id)
+        if router is None:
+            router = RoutingProcessor(self, job_name=port_id)
+            self.processors[port_id] = router
+        elif not isinstance(router, RoutingProcessor):
+            raise ValueError(
+                "nifi+sqs://{}/{} is already connected to a processor".format(
+                    self.name, port_id
+                )
+            )
+        router.table.add(processor, *predicates)
 
     def add_flowfile(
         self,
@@ -59,8 +99,20 @@ class NiFiQueue(GenericQueue):
         response_port_prefix: str = None,
         response_queue_name: str = None,
     ):
+        return self.add_flowfiles(
+            port_id, [flowfile], response_port_prefix, response_queue_name
+        )
+
+    def add_flowfiles(
+        self,
+        port_id: str,
+        flowfiles: List[FlowFile],
+        response_port_prefix: str = None,
+        response_queue_name: str = None,
+    ):
+        """Sends `flowfiles` in a single message, which must fit SQS's size limit."""
         codec = get_codec(FLOWFILE_CODEC_TYPE)
-        message_body = codec.serialize([flowfile])
+        message_body = codec.serialize(flowfiles)
 
         queue = self.get_queue()
         kwargs = {
@@ -86,9 +138,34 @@ class NiFiQueue(GenericQueue):
                 "DataType": "String",
             }
 
-        ret = queue.send_message(**kwargs)
+        sink = metrics.sink
+        labels = dict(queue=self.name, port=port_id)
+        start = time.perf_counter()
+        try:
+            ret = queue.send_message(**kwargs)
+        except Exception:
+            # The queue may have been deleted or recreated, resolve it again
+            get_client_pool(self.env).invalidate(self.get_sqs_queue_name())
+            if sink is not None:
+                sink.inc("nifi_sqs_send_failures_total", **labels)
+            raise
+        if sink is not None:
+            sink.observe("nifi_sqs_send_seconds", time.perf_counter() - start, **labels)
+        recorder = provenance.recorder
+        if recorder is not None:
+            transit_uri = "nifi+sqs://{}/{}".format(self.name, port_id)
+            for flowfile in flowfiles:
+                recorder.record(
+                    provenance.ProvenanceEventType.SEND,
+                    provenance.flowfile_uuid(flowfile),
+                    transit_uri=transit_uri,
+                )
         return ret["MessageId"]
 
+    def get_queue(self):
+        """The SQS queue resource of the calling thread, see `ClientPool`."""
+        return get_client_pool(self.env).get_queue(self.get_sqs_queue_name())
+
     def process_message(self, message):
         input_port_id = self.get_input_port_id(message)
         processor = self.get_processor(input_port_id)
@@ -0,0 +1,182 @@
+import logging
+import threading
+from typing import TYPE_CHECKING, Iterable
+
+import attr
+from nifi.flowfile import FlowFile
+
+if TYPE_CHECKING:  # pragma: no cover
+    from nifi.flowfile.journal import FlowFileJournal
+    from .queue import NiFiQueue
+
+logger = logging.getLogger(__name__)
+
+INPUT_PORT_ID = "sqs.input.port.id"
+RESPONSE_PORT_PREFIX = "sqs.response.port.prefix"
+RESPONSE_QUEUE = "sqs.response.queue"
+# SQS's message size limit, FlowFiles are base64 encoded in the message body
+MAX_MESSAGE_SIZE = 256 * 1024
+DEFAULT_MAX_ATTEMPTS = 5
+
+
+def _encoded_size(flowfile: FlowFile) -> int:
+    attributes = flowfile.get_attributes()
+    size = 17 + sum(len(k) + len(v) + 4 for k, v in attributes.items())
+    return (size + flowfile.get_content_size()) * 4 // 3 + 4
+
+
+@attr.s
+class JournaledSender(object):
+    """Buffers outgoing FlowFiles in a write-ahead journal before sending them.
+
+    `add_flowfile` returns once the FlowFile is durable in the journal, a background
+    thread drains the journal to the queue in batches and checkpoints what was sent.
+    The FlowFiles of a batch going to the same port are sent together, in as few
+    messages of up to `max_message_size` bytes as possible.
+    FlowFiles left in the journal by a crash are sent when the sender is restarted.
+
+    A batch failing `max_attempts` times in a row is set aside so that it does not
+    block the journal: its FlowFiles are sent one by one, those still failing are
+    logged and dropped.
+
+    Usage example.
+
+    journal = FlowFileJournal("/var/lib/worker/journal")
+    sender = JournaledSender(sqs.queue("test", NiFiQueue), journal)
+    sender.start()
+    sender.add_flowfile("test", ff)
+    sender.stop()
+    """
+
+    queue: "NiFiQueue" = attr.ib()
+    journal: "FlowFileJournal" = attr.ib()
+    batch_size = attr.ib(default=10)
+    interval = attr.ib(default=1.0)
+    max_message_size = attr.ib(default=MAX_MESSAGE_SIZE)
+    max_attempts = attr.ib(default=DEFAULT_MAX_ATTEMPTS)
+    _failures = attr.ib(default=0, init=False, repr=False)
+    _thread = attr.ib(default=None, init=False, repr=False)
+    _stopped = attr.ib(factory=threading.Event, init=False, repr=False)
+    _pending = attr.ib(factory=threading.Event, init=False, repr=False)
+
+    def add_flowfile(
+        self,
+        port_id: str,
+        flowfile: FlowFile,
+        response_port_prefix: str = None,
+        response_queue_name: str = None,
+        commit: bool = True,
+    ):
+        attributes = dict(flowfile.get_attributes())
+        attributes[INPUT_PORT_ID] = port_id
+        if response_port_prefix is not None:
+            attributes[RESPONSE_PORT_PREFIX] = response_port_prefix
+        if response_queue_name is not None:
+            attributes[RESPONSE_QUEUE] = response_queue_name
+
+        flowfile = FlowFile(attributes, flowfile.get_content())
+        if _encoded_size(flowfile) > self.max_message_size:
+            raise ValueError(
+                "FlowFile does not fit in a message of {} bytes".format(
+                    self.max_message_size
+                )
+            )
+
+        sequence = self.journal.append(flowfile)
+        if commit:
+            self.journal.commit(sequence)
+            self._pending.set()
+        return sequence
+
+    def send(self, flowfile: FlowFile):
+        return self.send_all([flowfile])
+
+    def send_all(self, flowfiles: Iterable[FlowFile]):
+        """Sends journaled FlowFiles, grouped by port, response port and queue."""
+        groups = {}
+        for flowfile in flowfiles:
+            attributes = dict(flowfile.get_attributes())
+            routing = tuple(
+                attributes.pop(key, None)
+                for key in (INPUT_PORT_ID, RESPONSE_PORT_PREFIX, RESPONSE_QUEUE)
+            )
+            groups.setdefault(routing, []).append(
+                FlowFile(attributes, flowfile.get_content())
+            )
+
+        for (
+            port_id,
+            response_port_prefix,
+            response_queue_name,
+        ), group in groups.items():
+            messages, size = [[]], 0
+            for flowfile in group:
+                flowfile_size = _encoded_size(flowfile)
+                if messages[-1] and size + flowfile_size > self.max_message_size:
+                    messages.append([])
+                    size = 0
+                messages[-1].append(flowfile)
+                size += flowfile_size
+            for message in messages:
+                self.queue.add_flowfiles(
+                    port_id, message, response_port_prefix, response_queue_name
+                )
+
+    def drain(self) -> int:
+        """Sends one batch of committed FlowFiles, returns how many were sent."""
+        batch = self.journal.read_batch(self.batch_size)
+        try:
+            self.send_all(flowfile for position, flowfile in batch)
+        except Exception:
+            self._failures += 1
+            if self._failures < self.max_attempts:
+                self.journal.rewind()
+                raise
+            logger.exception(
+                "Setting aside a batch for nifi+sqs://{} after {} attempts".format(
+                    self.queue.name, self._failures
+                )
+            )
+            self._set_aside(batch)
+        self._failures = 0
+        if batch:
+            self.journal.checkpoint(batch[-1][0])
+        return len(batch)
+
+    def _set_aside(self, batch):
+        for _, flowfile in batch:
+            try:
+                self.send(flowfile)
+            except Exception:
+                logger.exception(
+                    "Dropping FlowFile {} for nifi+sqs://{}".format(
+                        flowfile.get_attributes(), self.queue.name
+                    )
+                )
+
+    def run(self):
+        while not self._stopped.is_set():
+            self._pending.clear()
+            try:
+                if self.drain():
+                    continue
+            except Exception:
+                logger.exception(
+                    "Error while sending to nifi+sqs://{}".format(self.queue.name)
+                )
+            self._pending.wait(self.interval)
+
+    def start(self):
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def stop(self, drain=True):
+        self._stopped.set()
+        self._pending.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.journal.commit()
+        while drain and self.drain():
+            pass
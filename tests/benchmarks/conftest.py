@@ -0,0 +1,48 @@
+"""Shared fixtures for the `nifi.flowfile` benchmarks."""
+from uuid import uuid4
+
+import pytest
+from nifi.flowfile import FlowFile
+
+from ..helpers import encode
+
+BUNDLE_SIZE = 4 * 1024 * 1024
+MAX_RECORD_COUNT = 1000
+CONTENT_SIZES = [0, 1024, 64 * 1024]
+ATTRIBUTE_COUNTS = [3, 32]
+
+
+def make_flowfiles(content_size, attribute_count):
+    count = min(MAX_RECORD_COUNT, BUNDLE_SIZE // max(content_size, 1))
+    content = b"x" * content_size
+
+    def attributes(index):
+        uuid = str(uuid4())
+        rv = {"uuid": uuid, "path": "dir-{}/".format(index % 10), "filename": uuid}
+        for i in range(attribute_count - len(rv)):
+            rv["attribute.{}".format(i)] = "value-{}".format(index)
+        return rv
+
+    return [FlowFile(attributes(i), content) for i in range(count)]
+
+
+@pytest.fixture(params=CONTENT_SIZES, ids=lambda size: "content={}".format(size))
+def content_size(request):
+    return request.param
+
+
+@pytest.fixture(
+    params=ATTRIBUTE_COUNTS, ids=lambda count: "attributes={}".format(count)
+)
+def attribute_count(request):
+    return request.param
+
+
+@pytest.fixture
+def flowfiles(content_size, attribute_count):
+    return make_flowfiles(content_size, attribute_count)
+
+
+@pytest.fixture
+def bundle(flowfiles):
+    return encode(flowfiles)
@@ -0,0 +1,33 @@
+"""Benchmarks for `nifi.flowfile.cli` module."""
+import shutil
+
+from click.testing import CliRunner
+from nifi.flowfile import cli
+
+from .conftest import encode, make_flowfiles
+
+
+def test_unpack(benchmark, tmp_path, content_size, attribute_count):
+    bundle = tmp_path / "bundle.pkg"
+    bundle.write_bytes(encode(make_flowfiles(content_size, attribute_count)))
+    directory = tmp_path / "out"
+
+    def unpack():
+        shutil.rmtree(directory, ignore_errors=True)
+        return CliRunner().invoke(cli.unpack, ["-C", str(directory), str(bundle)])
+
+    assert benchmark(unpack).exit_code == 0
+
+
+def test_pack(benchmark, tmp_path, content_size, attribute_count):
+    bundle = tmp_path / "bundle.pkg"
+    bundle.write_bytes(encode(make_flowfiles(content_size, attribute_count)))
+    directory = tmp_path / "tree"
+    CliRunner().invoke(cli.unpack, ["-C", str(directory), str(bundle)])
+
+    def pack():
+        return CliRunner().invoke(
+            cli.pack, ["-C", str(directory), str(tmp_path / "packed.pkg")]
+        )
+
+    assert benchmark(pack).exit_code == 0
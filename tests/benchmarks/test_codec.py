@@ -0,0 +1,17 @@
+"""Benchmarks for `nifi.sqs_workers.codec` module."""
+import pytest
+
+codec = pytest.importorskip("nifi.sqs_workers.codec")
+
+
+def test_serialize(benchmark, flowfiles):
+    benchmark.extra_info["records"] = len(flowfiles)
+    assert benchmark(codec.FlowFileStreamCodec.serialize, flowfiles)
+
+
+def test_deserialize(benchmark, flowfiles):
+    serialized = codec.FlowFileStreamCodec.serialize(flowfiles)
+    benchmark.extra_info["records"] = len(flowfiles)
+    benchmark.extra_info["bytes"] = len(serialized)
+    rv = benchmark(codec.FlowFileStreamCodec.deserialize, serialized)
+    assert len(rv) == len(flowfiles)
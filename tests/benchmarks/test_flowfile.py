@@ -0,0 +1,29 @@
+"""Benchmarks for `nifi.flowfile.flowfile` module."""
+import pytest
+from nifi.flowfile import FlowFile
+
+from .conftest import ATTRIBUTE_COUNTS, make_flowfiles
+
+
+@pytest.fixture(
+    params=ATTRIBUTE_COUNTS, ids=lambda count: "attributes={}".format(count)
+)
+def flowfile(request) -> FlowFile:
+    return make_flowfiles(1024, request.param)[0]
+
+
+def test_get_attribute(benchmark, flowfile):
+    assert benchmark(flowfile.get_attribute, "filename") is not None
+
+
+def test_put_attribute(benchmark, flowfile):
+    benchmark(flowfile.put_attribute, "mime.type", "application/octet-stream")
+
+
+def test_put_all_attributes(benchmark, flowfile):
+    attributes = {"attribute.{}".format(i): "updated" for i in range(8)}
+    benchmark(flowfile.put_all_attributes, **attributes)
+
+
+def test_del_attribute(benchmark, flowfile):
+    benchmark(flowfile.del_attribute, "path")
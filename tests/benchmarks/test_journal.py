@@ -0,0 +1,44 @@
+"""Benchmarks for `nifi.flowfile.journal` module."""
+import os
+
+import pytest
+from nifi.flowfile.journal import FlowFileJournal
+
+from .conftest import make_flowfiles
+
+# Set to e.g. 10737418240 (10 GiB) to benchmark recovery on a large journal
+JOURNAL_SIZE = int(os.environ.get("NIFI_FLOWFILE_BENCHMARK_JOURNAL_SIZE", 16 << 20))
+
+
+@pytest.mark.parametrize("commit_every", [1, 100])
+def test_append_commit(benchmark, tmp_path, commit_every):
+    flowfiles = make_flowfiles(1024, 8)[:commit_every]
+
+    with FlowFileJournal(tmp_path) as journal:
+
+        def append_commit():
+            for ff in flowfiles:
+                journal.append(ff)
+            journal.commit()
+
+        benchmark.extra_info["records"] = len(flowfiles)
+        benchmark(append_commit)
+
+
+def test_recover(benchmark, tmp_path):
+    flowfiles = make_flowfiles(64 * 1024, 8)
+    with FlowFileJournal(tmp_path, segment_size=256 << 20, sync=False) as journal:
+        written = 0
+        while written < JOURNAL_SIZE:
+            for ff in flowfiles:
+                journal.append(ff)
+            written += len(flowfiles) * len(flowfiles[0].get_content())
+        journal.commit()
+        # Leave one record to recover in the last segment
+        journal.checkpoint(journal.read_batch(1)[0][0])
+
+    def recover():
+        FlowFileJournal(tmp_path).close()
+
+    benchmark.extra_info["bytes"] = written
+    benchmark.pedantic(recover, rounds=3)
@@ -0,0 +1,26 @@
+"""Benchmarks for the overhead of `nifi.flowfile.metrics`."""
+from io import BytesIO
+
+import pytest
+from nifi.flowfile import metrics
+from nifi.flowfile.stream import FlowFileStreamReader
+
+from .conftest import encode, make_flowfiles
+
+
+@pytest.fixture(params=[None, metrics.MetricsRegistry], ids=["disabled", "registry"])
+def sink(request):
+    metrics.set_sink(request.param() if request.param else None)
+    yield metrics.sink
+    metrics.set_sink(None)
+
+
+def test_read(benchmark, sink):
+    bundle = encode(make_flowfiles(1024, 8))
+
+    def read():
+        with BytesIO(bundle) as bytes_in:
+            return list(FlowFileStreamReader(bytes_in))
+
+    benchmark.group = "metrics-read"
+    benchmark(read)
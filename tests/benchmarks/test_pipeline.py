@@ -0,0 +1,31 @@
+"""Benchmarks for `nifi.flowfile.pipeline` against a hand written loop."""
+from io import BytesIO
+
+import pytest
+from nifi.flowfile import FlowFile
+from nifi.flowfile.pipeline import from_file, to_file
+from nifi.flowfile.stream import FlowFileStreamReader, FlowFileStreamWriter
+
+
+def rename(flowfile):
+    attributes = dict(flowfile.get_attributes(), x="1")
+    return FlowFile(attributes, flowfile.get_content())
+
+
+@pytest.mark.parametrize("workers", [None, 4], ids="workers={}".format)
+def test_pipeline(benchmark, bundle, workers):
+    def run():
+        with BytesIO(bundle) as bytes_in, BytesIO() as bytes_out:
+            from_file(bytes_in).map(rename, workers=workers).sink(to_file(bytes_out))
+
+    benchmark(run)
+
+
+def test_loop(benchmark, bundle):
+    def run():
+        with BytesIO(bundle) as bytes_in, BytesIO() as bytes_out:
+            writer = FlowFileStreamWriter(bytes_out)
+            for flowfile in FlowFileStreamReader(bytes_in):
+                writer.write(rename(flowfile))
+
+    benchmark(run)
@@ -0,0 +1,37 @@
+"""Benchmarks for the overhead of `nifi.flowfile.provenance`."""
+import pytest
+from nifi.flowfile import provenance
+
+from .conftest import make_flowfiles
+
+
+@pytest.fixture(params=[None, 1.0, 0.01], ids=["disabled", "all", "sampled"])
+def recorder(request, tmp_path):
+    if request.param is None:
+        yield None
+        return
+    store = provenance.ProvenanceEventStore(str(tmp_path))
+    recorder = provenance.ProvenanceRecorder(store, sample_rate=request.param)
+    provenance.set_recorder(recorder)
+    yield recorder
+    provenance.set_recorder(None)
+    recorder.close()
+    store.close()
+
+
+def test_put_attribute(benchmark, recorder):
+    flowfile = make_flowfiles(1, 8)[0]
+
+    benchmark.group = "provenance-put-attribute"
+    benchmark(flowfile.put_attribute, "mime.type", "application/octet-stream")
+
+
+def test_record(benchmark, recorder):
+    if recorder is None:
+        pytest.skip("nothing to record")
+
+    def record():
+        recorder.record(provenance.ProvenanceEventType.SEND, "uuid", transit_uri="x")
+
+    benchmark.group = "provenance-record"
+    benchmark(record)
@@ -0,0 +1,38 @@
+"""Benchmarks for `nifi.flowfile.routing` as the number of rules grows."""
+import pytest
+from nifi.flowfile.routing import Compare, Equals, Prefix, Regex, RoutingTable
+
+RULE_COUNTS = [10, 1000, 10000]
+
+
+def make_table(rule_count):
+    table = RoutingTable()
+    for i in range(rule_count):
+        kind = i % 4
+        if kind == 0:
+            table.add(i, Equals("mime.type", "application/x-{}".format(i)))
+        elif kind == 1:
+            table.add(i, Prefix("filename", "dir-{}/".format(i)))
+        elif kind == 2:
+            table.add(i, Compare("size", ">", i * 1000))
+        else:
+            table.add(i, Regex("path", r"/data/{}/.*\.csv".format(i)))
+    return table.compile() and table
+
+
+@pytest.mark.parametrize("rule_count", RULE_COUNTS, ids="rules={}".format)
+@pytest.mark.parametrize("compiled", [True, False], ids=["compiled", "linear"])
+def test_route(benchmark, rule_count, compiled):
+    table = make_table(rule_count)
+    attributes = {
+        "mime.type": "application/x-4",
+        "filename": "dir-5/file",
+        "size": "2500",
+        "path": "/data/7/file.csv",
+    }
+    if compiled:
+        rv = benchmark(table.route, attributes)
+    else:
+        rules = table.rules
+        rv = benchmark(lambda: [rule.target for rule in rules if rule(attributes)])
+    assert rv == [2, 4, 5, 7]
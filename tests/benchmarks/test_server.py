@@ -0,0 +1,41 @@
+"""Load test of `nifi.flowfile.server` over local HTTP connections."""
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from nifi.flowfile.server import FLOWFILE_V3_CONTENT_TYPE, ListenHTTPServer
+
+from .conftest import encode, make_flowfiles
+
+CLIENTS = [1, 8]
+REQUESTS_PER_CLIENT = 8
+
+
+@pytest.fixture(scope="module")
+def server():
+    async def handler(flowfile):
+        pass
+
+    server = ListenHTTPServer(handler, host="127.0.0.1", port=0).start_in_thread()
+    yield server
+    server.stop_thread()
+
+
+@pytest.mark.parametrize("clients", CLIENTS, ids=lambda n: "clients={}".format(n))
+def test_post_bundles(benchmark, server, content_size, clients):
+    body = encode(make_flowfiles(content_size, 8))
+    headers = {"Content-Type": FLOWFILE_V3_CONTENT_TYPE}
+
+    def client(_):
+        connection = http.client.HTTPConnection("127.0.0.1", server.port)
+        try:
+            for _ in range(REQUESTS_PER_CLIENT):
+                connection.request("POST", "/contentListener", body, headers)
+                response = connection.getresponse()
+                response.read()
+                assert response.status == 200
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(clients) as executor:
+        benchmark(lambda: list(executor.map(client, range(clients))))
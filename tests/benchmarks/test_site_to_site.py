@@ -0,0 +1,21 @@
+"""Benchmarks for `nifi.site_to_site` against a local stand-in peer."""
+import pytest
+from nifi.site_to_site import SiteToSiteClient
+from nifi.site_to_site.server import SiteToSiteServer
+
+BATCH_COUNTS = [1, 100, 1000]
+
+
+@pytest.fixture(scope="module")
+def server():
+    with SiteToSiteServer(lambda port_id, flowfiles: None) as server:
+        yield server
+
+
+@pytest.mark.parametrize("batch_count", BATCH_COUNTS, ids="batch={}".format)
+def test_send(benchmark, server, content_size, batch_count):
+    from .conftest import make_flowfiles
+
+    flowfiles = make_flowfiles(content_size, 8)
+    with SiteToSiteClient([server.peer], "benchmark", batch_count=batch_count) as c:
+        assert benchmark(c.send, flowfiles) == len(flowfiles)
@@ -0,0 +1,45 @@
+"""Benchmarks for `nifi.sqs_workers` against an in-memory SQS."""
+from types import SimpleNamespace
+
+import pytest
+from nifi.flowfile import FlowFile
+
+from ..helpers import make_queue, make_sqs_env
+
+
+@pytest.fixture
+def queue():
+    return make_queue(make_sqs_env(), "benchmark")
+
+
+@pytest.fixture
+def flowfile():
+    return FlowFile({"filename": "benchmark", "path": "./"}, b"x" * 1024)
+
+
+def make_message(queue, flowfile, response_port_prefix=None):
+    from nifi.sqs_workers.codec import FLOWFILE_CODEC_TYPE, get_codec
+
+    attributes = {
+        "ContentType": {"StringValue": FLOWFILE_CODEC_TYPE},
+        "InputPortId": {"StringValue": "port"},
+    }
+    if response_port_prefix is not None:
+        attributes["ResponseQueue"] = {"StringValue": queue.name}
+        attributes["ResponsePortPrefix"] = {"StringValue": response_port_prefix}
+    return SimpleNamespace(
+        message_id="benchmark",
+        body=get_codec(FLOWFILE_CODEC_TYPE).serialize([flowfile]),
+        message_attributes=attributes,
+    )
+
+
+def test_add_flowfile(benchmark, queue, flowfile):
+    assert benchmark(queue.add_flowfile, "port", flowfile)
+
+
+@pytest.mark.parametrize("response_port_prefix", [None, "port"])
+def test_process_message(benchmark, queue, flowfile, response_port_prefix):
+    queue.connect_processor(lambda ff: None, "port")
+    message = make_message(queue, flowfile, response_port_prefix)
+    assert benchmark(queue.process_message, message)
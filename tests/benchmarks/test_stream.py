@@ -0,0 +1,59 @@
+"""Benchmarks for `nifi.flowfile.stream` module."""
+import tracemalloc
+from io import BytesIO
+
+import pytest
+from nifi.flowfile.stream import (
+    DEFAULT_STRING_CACHE_SIZE,
+    FlowFileStreamReader,
+    FlowFileStreamWriter,
+)
+
+from .conftest import encode, make_flowfiles
+
+
+def test_write_all(benchmark, flowfiles):
+    def write_all():
+        with BytesIO() as bytes_out:
+            FlowFileStreamWriter(bytes_out).write_all(flowfiles)
+            return bytes_out.tell()
+
+    benchmark.extra_info["records"] = len(flowfiles)
+    assert benchmark(write_all) > 0
+
+
+def test_read(benchmark, bundle, flowfiles):
+    def read():
+        with BytesIO(bundle) as bytes_in:
+            return list(FlowFileStreamReader(bytes_in))
+
+    benchmark.extra_info["records"] = len(flowfiles)
+    benchmark.extra_info["bytes"] = len(bundle)
+    assert len(benchmark(read)) == len(flowfiles)
+
+
+@pytest.mark.parametrize(
+    "string_cache_size",
+    [0, DEFAULT_STRING_CACHE_SIZE],
+    ids=lambda size: "string_cache={}".format(size),
+)
+def test_read_string_cache(benchmark, attribute_count, string_cache_size):
+    flowfiles = make_flowfiles(0, attribute_count)
+    bundle = encode(flowfiles)
+
+    def read():
+        with BytesIO(bundle) as bytes_in:
+            return list(
+                FlowFileStreamReader(bytes_in, string_cache_size=string_cache_size)
+            )
+
+    tracemalloc.start()
+    decoded = read()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del decoded
+
+    benchmark.group = "read-string-cache-attributes={}".format(attribute_count)
+    benchmark.extra_info["records"] = len(flowfiles)
+    benchmark.extra_info["bytes_per_record"] = memory // len(flowfiles)
+    assert len(benchmark(read)) == len(flowfiles)
@@ -0,0 +1,28 @@
+"""Helpers shared by the unit tests and the benchmarks."""
+from io import BytesIO
+
+import pytest
+from nifi.flowfile.stream import FlowFileStreamWriter
+
+
+def encode(flowfiles):
+    with BytesIO() as bytes_out:
+        FlowFileStreamWriter(bytes_out).write_all(flowfiles)
+        return bytes_out.getvalue()
+
+
+def make_sqs_env():
+    """An `SQSEnv` backed by sqs_workers' in-memory SQS, skips without sqs_workers."""
+    sqs_workers = pytest.importorskip("sqs_workers")
+    from sqs_workers.memory_sqs import MemorySession
+
+    return sqs_workers.SQSEnv(MemorySession())
+
+
+def make_queue(env, name="test"):
+    """Creates the SQS queue `name` of `env` and returns it as a NiFiQueue."""
+    from nifi.sqs_workers import NiFiQueue
+    from sqs_workers import create_standard_queue
+
+    create_standard_queue(env, name)
+    return env.queue(name, NiFiQueue)
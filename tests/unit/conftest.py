@@ -0,0 +1,14 @@
+"""Shared fixtures for the `nifi` unit tests."""
+import pytest
+
+from ..helpers import make_queue, make_sqs_env
+
+
+@pytest.fixture
+def sqs_env():
+    return make_sqs_env()
+
+
+@pytest.fixture
+def queue(sqs_env):
+    return make_queue(sqs_env)
@@ -0,0 +1,112 @@
+"""Tests for `nifi.flowfile.arrow` module."""
+from io import BytesIO
+
+import pytest
+from click.testing import CliRunner
+from nifi.flowfile import cli, FlowFile
+from nifi.flowfile.stream import FlowFileStreamReader, FlowFileStreamWriter
+
+pa = pytest.importorskip("pyarrow")
+arrow = pytest.importorskip("nifi.flowfile.arrow")
+
+
+@pytest.fixture
+def flowfiles():
+    return [
+        FlowFile({"filename": f"file-{i}", "mime.type": "text/plain"}, b"x" * i)
+        for i in range(5)
+    ] + [FlowFile({"filename": "extra", "extra": "1"}, b"extra")]
+
+
+@pytest.fixture
+def bundle(flowfiles):
+    with BytesIO() as bytes_out:
+        FlowFileStreamWriter(bytes_out).write_all(flowfiles)
+        return bytes_out.getvalue()
+
+
+def test_record_batches(bundle):
+    batches = list(arrow.iter_record_batches(BytesIO(bundle), batch_size=4))
+
+    assert [batch.num_rows for batch in batches] == [4, 2]
+    assert batches[0].schema.names == ["filename", "mime.type", arrow.CONTENT_COLUMN]
+    assert pa.types.is_dictionary(batches[0].schema.field("mime.type").type)
+    assert batches[1].column("extra").to_pylist() == [None, "1"]
+
+
+def test_offsets(bundle, flowfiles):
+    (batch,) = arrow.iter_record_batches(BytesIO(bundle), content="offsets")
+
+    offsets = batch.column(arrow.OFFSET_COLUMN).to_pylist()
+    lengths = batch.column(arrow.LENGTH_COLUMN).to_pylist()
+    for ff, offset, length in zip(flowfiles, offsets, lengths):
+        assert bundle[offset:][:length] == ff.get_content()
+
+
+def test_round_trip(bundle, flowfiles):
+    table = arrow.read_table(BytesIO(bundle), batch_size=4)
+    assert table.num_rows == len(flowfiles)
+
+    with BytesIO() as bytes_out:
+        arrow.write_table(bytes_out, table)
+        encoded = bytes_out.getvalue()
+    assert list(FlowFileStreamReader(BytesIO(encoded))) == flowfiles
+
+
+@pytest.mark.parametrize("format_", ["parquet", "arrow"])
+@pytest.mark.parametrize("attributes", [[], ["-a", "filename"]])
+@pytest.mark.parametrize("batch_size", [65536, 2])
+def test_command_line_export(
+    bundle, flowfiles, tmp_path, format_, attributes, batch_size
+):
+    (tmp_path / "in.pkg").write_bytes(bundle)
+    output = str(tmp_path / "out")
+
+    result = CliRunner().invoke(
+        cli.export,
+        [
+            "-f",
+            format_,
+            "--batch-size",
+            str(batch_size),
+            *attributes,
+            str(tmp_path / "in.pkg"),
+            output,
+        ],
+    )
+    assert result.exit_code == 0, result.output
+
+    if format_ == "parquet":
+        table = pytest.importorskip("pyarrow.parquet").read_table(output)
+    else:
+        table = pa.ipc.open_file(output).read_all()
+    assert table.num_rows == len(flowfiles)
+    assert table.column("filename").to_pylist() == [
+        ff.get_attribute("filename") for ff in flowfiles
+    ]
+
+
+@pytest.mark.parametrize("format_", ["parquet", "arrow"])
+def test_export_streams_seekable_files(monkeypatch, tmp_path, format_):
+    flowfiles = [
+        FlowFile({"a": str(i)} if i % 2 else {"b": "x"}, b"") for i in range(5)
+    ]
+    with BytesIO() as bytes_in:
+        FlowFileStreamWriter(bytes_in).write_all(flowfiles)
+        bytes_in.seek(0)
+        assert arrow.scan_keys(bytes_in) == ["b", "a"]
+
+        def read_table(*args, **kwargs):
+            raise AssertionError("the bundle must not be read into memory")
+
+        monkeypatch.setattr(arrow, "read_table", read_table)
+        bytes_in.seek(0)
+        output = str(tmp_path / "out")
+        assert arrow.export(bytes_in, output, format_, batch_size=1) == 5
+
+    if format_ == "parquet":
+        table = pytest.importorskip("pyarrow.parquet").read_table(output)
+    else:
+        table = pa.ipc.open_file(output).read_all()
+    assert table.column("a").to_pylist() == [None, "1", None, "3", None]
+    assert table.column("b").to_pylist() == ["x", None, "x", None, "x"]
@@ -7,7 +7,12 @@ import pytest
 from click.testing import CliRunner
 from nifi import flowfile
 from nifi.flowfile import cli, FlowFile
-from nifi.flowfile.stream import FlowFileStreamReader, FlowFileStreamWriter
+from nifi.flowfile.dedup import ContentDigestIndex
+from nifi.flowfile.stream import (
+    FlowFileStreamReader,
+    FlowFileStreamWriter,
+    StringCache,
+)
 
 
 @pytest.fixture
@@ -77,3 +82,101 @@ def test_pack_unpack_file(flowfile_fragments, tmp_path):
         unpacked_ff = list(f)
 
     assert flowfile_fragments == unpacked_ff
+
+
+def test_pack_dedup(flowfile_fragments):
+    index = ContentDigestIndex()
+    with BytesIO() as bytes_out:
+        ff_writer = FlowFileStreamWriter(bytes_out, dedup=index)
+        ff_writer.write_all(flowfile_fragments + flowfile_fragments)
+        encoded = bytes_out.getvalue()
+
+    with BytesIO(encoded) as bytes_in:
+        unpacked_flowfiles = list(FlowFileStreamReader(bytes_in))
+
+    # "Hello World!" repeats 'l' and 'o'
+    assert [ff.get_content() for ff in unpacked_flowfiles] == [
+        b"H",
+        b"e",
+        b"l",
+        b"o",
+        b" ",
+        b"W",
+        b"r",
+        b"d",
+        b"!",
+    ]
+    assert index.duplicates == 2 * len(flowfile_fragments) - 9
+    assert index.bytes_saved == index.duplicates
+
+
+def test_unpack_shares_strings(flowfile_fragments):
+    with BytesIO() as bytes_out:
+        FlowFileStreamWriter(bytes_out).write_all(flowfile_fragments)
+        encoded = bytes_out.getvalue()
+
+    with BytesIO(encoded) as bytes_in:
+        first, second = list(FlowFileStreamReader(bytes_in))[:2]
+    assert first.get_attributes() == flowfile_fragments[0].get_attributes()
+    # Attribute keys and repeated values are the same objects in every record
+    for key, other_key in zip(first.get_attributes(), second.get_attributes()):
+        assert key is other_key
+    assert first["fragment.id"] is second["fragment.id"]
+
+    with BytesIO(encoded) as bytes_in:
+        first, second = list(FlowFileStreamReader(bytes_in, string_cache_size=0))[:2]
+    assert first["fragment.id"] == second["fragment.id"]
+    assert first["fragment.id"] is not second["fragment.id"]
+
+
+def test_string_cache_is_bounded():
+    strings = StringCache(maxsize=2, max_length=4)
+    assert strings.decode(b"a") is strings.decode(b"a")
+    strings.decode(b"b")
+    strings.decode(b"c")
+    assert len(strings) == 1
+    strings.decode(b"long value")
+    assert len(strings) == 1
+
+
+def test_command_line_pack_unpack(flowfile_fragments, tmp_path):
+    with flowfile.open(tmp_path / "in.pkg", mode="w") as f:
+        f.write_all(
+            FlowFile(
+                dict(
+                    ff.get_attributes(),
+                    path="./",
+                    filename="fragment-{}".format(ff["fragment.index"]),
+                ),
+                ff.get_content(),
+            )
+            for ff in flowfile_fragments
+        )
+
+    runner = CliRunner()
+    result = runner.invoke(
+        cli.unpack, ["-C", str(tmp_path / "out"), str(tmp_path / "in.pkg")]
+    )
+    assert result.exit_code == 0
+
+    result = runner.invoke(
+        cli.pack,
+        ["--dedup", "-v", "-C", str(tmp_path / "out"), str(tmp_path / "out.pkg")],
+    )
+    assert result.exit_code == 0
+    assert "3 bytes saved" in result.output
+
+    with flowfile.open(tmp_path / "out.pkg", mode="r") as f:
+        packed = list(f)
+    assert len(packed) == len(flowfile_fragments) - 3
+
+    # FILE inside DIR is not packed into itself, also when overwritten
+    for _ in range(2):
+        result = runner.invoke(
+            cli.pack, ["-C", str(tmp_path / "out"), str(tmp_path / "out" / "out.pkg")]
+        )
+        assert result.exit_code == 0
+    with flowfile.open(tmp_path / "out" / "out.pkg", mode="r") as f:
+        filenames = [ff["filename"] for ff in f]
+    assert len(filenames) == len(flowfile_fragments)
+    assert "out.pkg" not in filenames
@@ -0,0 +1,56 @@
+"""Import-time regression tests for `nifi.flowfile` and `nifi.sqs_workers`."""
+import subprocess
+import sys
+
+import pytest
+
+# Generous enough for slow CI runners, tight enough to catch e.g. boto3 creeping in.
+CLI_IMPORT_TIME_BUDGET_US = 250000
+
+
+def import_times(*args):
+    """Returns the cumulative import time (us) of each top-level import."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    rv = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+        if cumulative_us.strip().isdigit() and not name.startswith("  "):
+            rv[name.strip()] = int(cumulative_us)
+    return rv
+
+
+def imported_modules(statement):
+    result = subprocess.run(
+        [sys.executable, "-c", statement + "; import sys; print(*sys.modules)"],
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    return set(result.stdout.split())
+
+
+@pytest.mark.parametrize(
+    "statement, unwanted",
+    [
+        ("import nifi.flowfile", {"attr", "nifi.flowfile.stream"}),
+        ("import nifi.flowfile.cli", {"attr", "configparser", "hashlib"}),
+        ("import nifi.sqs_workers", {"boto3", "sqs_workers"}),
+    ],
+)
+def test_lazy_imports(statement, unwanted):
+    assert not imported_modules(statement) & unwanted
+
+
+def test_cli_import_time_budget():
+    baseline = import_times("-c", "pass")
+    cli = import_times("-m", "nifi.flowfile", "--help")
+    extra = sum(us for name, us in cli.items() if name not in baseline)
+    assert extra < CLI_IMPORT_TIME_BUDGET_US
@@ -0,0 +1,124 @@
+"""Tests for `nifi.flowfile.journal` module."""
+import os
+
+import pytest
+from nifi.flowfile import FlowFile
+from nifi.flowfile.journal import FlowFileJournal
+
+
+@pytest.fixture
+def flowfiles():
+    return [FlowFile(dict(index=f"{i}"), f"content-{i}".encode()) for i in range(10)]
+
+
+def test_append_commit_read(flowfiles, tmp_path):
+    with FlowFileJournal(tmp_path, segment_size=64) as journal:
+        for ff in flowfiles[:5]:
+            journal.append(ff)
+        assert journal.read_batch(10) == []
+
+        journal.commit()
+        for ff in flowfiles[5:]:
+            journal.append(ff)
+        journal.commit()
+
+        batch = journal.read_batch(3)
+        assert [ff for _, ff in batch] == flowfiles[:3]
+        journal.checkpoint(batch[-1][0])
+
+        rest = journal.read_batch(10)
+        assert [ff for _, ff in rest] == flowfiles[3:]
+        journal.checkpoint(rest[-1][0])
+
+    assert len([n for n in os.listdir(tmp_path) if n.endswith(".ff3")]) == 1
+
+
+def test_recover_after_crash(flowfiles, tmp_path):
+    journal = FlowFileJournal(tmp_path)
+    for ff in flowfiles:
+        journal.append(ff)
+    journal.commit()
+    journal.checkpoint(journal.read_batch(4)[-1][0])
+    journal.close()
+
+    # Simulate a crash in the middle of writing the last record
+    segment = os.path.join(tmp_path, sorted(os.listdir(tmp_path))[0])
+    with open(segment, "r+b") as f:
+        f.truncate(os.path.getsize(segment) - 3)
+
+    with FlowFileJournal(tmp_path) as journal:
+        assert [ff for _, ff in journal.read_batch(10)] == flowfiles[4:-1]
+        journal.append(flowfiles[-1])
+        journal.commit()
+        assert [ff for _, ff in journal.read_batch(10)] == flowfiles[-1:]
+
+
+def test_journaled_sender(queue, flowfiles, tmp_path):
+    from nifi.sqs_workers import JournaledSender
+
+    received = []
+    queue.connect_processor(received.append, "port")
+
+    sender = JournaledSender(queue, FlowFileJournal(tmp_path), interval=0.01)
+    sender.start()
+    for ff in flowfiles:
+        sender.add_flowfile("port", ff)
+    sender.stop()
+
+    queue.process_batch()
+    assert received == flowfiles
+
+
+def test_journaled_sender_batches(queue, flowfiles, tmp_path):
+    from nifi.sqs_workers import JournaledSender
+
+    sender = JournaledSender(queue, FlowFileJournal(tmp_path), batch_size=100)
+    for i, ff in enumerate(flowfiles):
+        sender.add_flowfile("port-{}".format(i % 2), ff)
+    assert sender.drain() == len(flowfiles)
+
+    messages = queue.get_raw_messages(0, 10)
+    assert len(messages) == 2
+
+    # FlowFiles not fitting in a single message are split over several
+    sender = JournaledSender(queue, FlowFileJournal(tmp_path / "small"), 100)
+    for ff in flowfiles:
+        sender.add_flowfile("port", ff)
+    sender.max_message_size = 1
+    sender.drain()
+    assert len(queue.get_raw_messages(0, 10)) == len(flowfiles)
+
+    # FlowFiles that can never fit in a message are rejected before journaling
+    with pytest.raises(ValueError):
+        sender.add_flowfile("port", FlowFile({}, b"x"))
+    assert sender.journal.read_batch(10) == []
+
+
+def test_journaled_sender_sets_aside_failing_batches(queue, flowfiles, tmp_path):
+    from nifi.sqs_workers import JournaledSender
+
+    sent = []
+    add_flowfiles = queue.add_flowfiles
+
+    def failing_add_flowfiles(port_id, message, *args):
+        if any(ff.get_attribute("poison") for ff in message):
+            raise IOError("rejected")
+        sent.extend(message)
+        return add_flowfiles(port_id, message, *args)
+
+    queue.add_flowfiles = failing_add_flowfiles
+    sender = JournaledSender(queue, FlowFileJournal(tmp_path), 10, max_attempts=3)
+    sender.add_flowfile("port", flowfiles[0])
+    sender.add_flowfile("port", FlowFile({"poison": "1"}))
+    sender.add_flowfile("port", flowfiles[1])
+    for _ in range(2):
+        with pytest.raises(IOError):
+            sender.drain()
+    assert sent == []
+
+    # The third attempt sends what it can and drops the rest
+    assert sender.drain() == 3
+    assert sent == flowfiles[:2]
+    sender.add_flowfile("port", flowfiles[2])
+    assert sender.drain() == 1
+    assert sent == flowfiles[:3]
@@ -0,0 +1,92 @@
+"""Tests for `nifi.flowfile.metrics` module."""
+from io import BytesIO
+
+import pytest
+from nifi.flowfile import FlowFile, metrics, provenance
+from nifi.flowfile.stream import FlowFileStreamReader, FlowFileStreamWriter
+
+
+@pytest.fixture
+def registry():
+    registry = metrics.MetricsRegistry()
+    metrics.set_sink(registry)
+    yield registry
+    metrics.set_sink(None)
+
+
+def test_stream_metrics(registry):
+    flowfiles = [FlowFile(dict(a="1", b="2"), b"Hello"), FlowFile(dict(), b"World!")]
+    with BytesIO() as bytes_out:
+        FlowFileStreamWriter(bytes_out).write_all(flowfiles)
+        encoded = bytes_out.getvalue()
+    with BytesIO(encoded) as bytes_in:
+        list(FlowFileStreamReader(bytes_in))
+
+    for direction in ["encoded", "decoded"]:
+        assert registry.get_counter(f"flowfile_records_{direction}_total") == 2
+        assert registry.get_counter(f"flowfile_content_bytes_{direction}_total") == 11
+        assert registry.get_counter(f"flowfile_attributes_{direction}_total") == 2
+
+
+def test_long_lived_writer_metrics(registry, monkeypatch, tmp_path):
+    from nifi.flowfile import stream
+    from nifi.flowfile.journal import FlowFileJournal
+
+    writer = FlowFileStreamWriter(BytesIO())
+    writer.write(FlowFile(dict(), b"a"))
+    assert registry.get_counter("flowfile_records_encoded_total") == 0
+    monkeypatch.setattr(stream, "METRICS_FLUSH_INTERVAL", 0)
+    FlowFileStreamWriter(BytesIO()).write(FlowFile(dict(), b"b"))
+    assert registry.get_counter("flowfile_records_encoded_total") == 1
+    writer.flush_metrics()
+    assert registry.get_counter("flowfile_records_encoded_total") == 2
+
+    # Internal records of journals and provenance are not user FlowFiles
+    store = provenance.ProvenanceEventStore(str(tmp_path / "provenance"))
+    provenance.set_recorder(provenance.ProvenanceRecorder(store))
+    try:
+        with FlowFileJournal(tmp_path / "journal", sync=False) as journal:
+            flowfile = FlowFile(dict(), b"c")
+            for i in range(5):
+                flowfile.put_attribute("i", str(i))
+            journal.append(flowfile)
+            journal.commit()
+        provenance.get_recorder().close()
+        assert len(list(store)) == 5
+    finally:
+        provenance.set_recorder(None)
+        store.close()
+    assert registry.get_counter("flowfile_records_encoded_total") == 2
+    assert registry.get_counter("flowfile_records_decoded_total") == 0
+
+
+def test_render_prometheus(registry):
+    registry.inc("requests_total", port="a")
+    registry.inc("requests_total", 2, port="b")
+    registry.observe("latency_seconds", 0.003)
+
+    text = registry.render_prometheus()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{port="b"} 2' in text
+    assert 'latency_seconds_bucket{le="0.001"} 0' in text
+    assert 'latency_seconds_bucket{le="0.005"} 1' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 1' in text
+    assert "latency_seconds_count 1" in text
+
+
+def test_processor_metrics(registry, queue):
+    queue.connect_processor(lambda ff: None, "ping")
+    queue.connect_processor(lambda ff: 1 / 0, "ping/success")
+
+    queue.add_flowfile("ping", FlowFile(dict(a="1")), response_port_prefix="ping")
+    queue.process_batch()
+    queue.process_batch()
+
+    labels = dict(queue="test", port="ping")
+    processed = "nifi_sqs_flowfiles_processed_total"
+    assert registry.get_histogram("nifi_sqs_send_seconds", **labels).count == 1
+    assert registry.get_histogram("nifi_sqs_process_seconds", **labels).count == 1
+    assert registry.get_counter(processed, outcome="failure", **labels) == 0
+    assert registry.get_counter(processed, outcome="success", **labels) == 1
+    labels["port"] = "ping/success"
+    assert registry.get_counter(processed, outcome="failure", **labels) == 1
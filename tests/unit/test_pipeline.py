@@ -0,0 +1,123 @@
+"""Tests for `nifi.flowfile.pipeline` module."""
+import threading
+from io import BytesIO
+
+import pytest
+from nifi.flowfile import FlowFile
+from nifi.flowfile.pipeline import from_file, from_queue, pipeline, to_file, to_queue
+from nifi.flowfile.stream import FlowFileStreamReader, FlowFileStreamWriter
+
+
+def make_flowfiles(count):
+    return [FlowFile(dict(i=str(i)), str(i).encode()) for i in range(count)]
+
+
+def index(flowfile):
+    return int(flowfile.get_attribute("i"))
+
+
+def double(flowfile):
+    return FlowFile(dict(i=str(2 * index(flowfile))), flowfile.get_content())
+
+
+def split(flowfile):
+    return [flowfile] * (index(flowfile) % 3)
+
+
+def test_stages():
+    rv = (
+        pipeline(make_flowfiles(10))
+        .filter(lambda ff: index(ff) % 2)
+        .map(double)
+        .flat_map(lambda ff: [ff, ff])
+        .batch(4)
+    )
+    assert [[index(ff) for ff in batch] for batch in rv] == [
+        [2, 2, 6, 6],
+        [10, 10, 14, 14],
+        [18, 18],
+    ]
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_parallel_stages_keep_order(executor):
+    rv = (
+        pipeline(make_flowfiles(50))
+        .map(double, workers=4, executor=executor)
+        .flat_map(split, workers=2, executor=executor)
+    )
+    expected = [2 * i for i in range(50) for _ in range(2 * i % 3)]
+    assert [index(ff) for ff in rv] == expected
+
+
+def test_backpressure():
+    pulled = []
+
+    def source():
+        for ff in make_flowfiles(100):
+            pulled.append(ff)
+            yield ff
+
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow(ff):
+        started.set()
+        release.wait()
+        return ff
+
+    rv = iter(pipeline(source()).map(slow, workers=2, buffer=4))
+    consumer = threading.Thread(target=next, args=(rv,))
+    consumer.start()
+    started.wait()
+    assert len(pulled) <= 5
+    release.set()
+    consumer.join()
+    assert len(list(rv)) == 99
+
+
+def test_file_source_and_sink(tmp_path):
+    path = tmp_path / "in.ff3"
+    with open(path, "wb") as f:
+        FlowFileStreamWriter(f).write_all(make_flowfiles(5))
+
+    with BytesIO() as out:
+        assert from_file(path).map(double).batch(2).sink(to_file(out)) == 3
+        out.seek(0)
+        assert [index(ff) for ff in FlowFileStreamReader(out)] == [0, 2, 4, 6, 8]
+
+
+def test_queue_source_and_sink(queue):
+    assert pipeline(make_flowfiles(7)).batch(3).sink(to_queue(queue, "in")) == 3
+    assert sorted(index(ff) for ff in from_queue(queue)) == list(range(7))
+    assert list(from_queue(queue)) == []
+
+
+def test_queue_source_backs_off_when_idle(queue, monkeypatch):
+    from nifi.flowfile import pipeline as pipeline_module
+
+    polls, delays = [], []
+    get_raw_messages = queue.get_raw_messages
+
+    def recording_get_raw_messages(wait_seconds, max_messages):
+        polls.append(wait_seconds)
+        return get_raw_messages(wait_seconds, max_messages)
+
+    def sleep(seconds):
+        delays.append(seconds)
+        if len(delays) == 6:
+            to_queue(queue, "in").write(make_flowfiles(1))
+
+    monkeypatch.setattr(queue, "get_raw_messages", recording_get_raw_messages)
+    monkeypatch.setattr(pipeline_module.time, "sleep", sleep)
+
+    source = iter(from_queue(queue, wait_seconds=0, stop_when_empty=False))
+    assert index(next(source)) == 0
+    assert delays == [0.5, 1.0, 2.0, 4.0, 8.0, 10.0]
+    assert polls == [0] * 7
+
+    # Long polling by default, the receive itself waits for messages
+    to_queue(queue, "in").write(make_flowfiles(1))
+    assert index(next(iter(from_queue(queue, stop_when_empty=False)))) == 0
+    assert polls[-1] == 20
+    assert len(delays) == 6
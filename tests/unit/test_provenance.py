@@ -0,0 +1,187 @@
+"""Tests for `nifi.flowfile.provenance` module."""
+import io
+import os
+
+import pytest
+from nifi.flowfile import FlowFile, provenance
+from nifi.flowfile.dedup import ContentDigestIndex
+from nifi.flowfile.provenance import (
+    ProvenanceEventStore,
+    ProvenanceEventType,
+    ProvenanceRecorder,
+)
+from nifi.flowfile.stream import FlowFileStreamWriter
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ProvenanceEventStore(str(tmp_path / "provenance"))
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def recorder(store):
+    recorder = ProvenanceRecorder(store, flush_interval=0.01)
+    provenance.set_recorder(recorder)
+    yield recorder
+    provenance.set_recorder(None)
+    recorder.close()
+
+
+def event(event_type, uuid, parents=(), children=(), timestamp=0.0, **details):
+    return provenance.ProvenanceEvent(
+        event_type, timestamp, uuid, parents, children, details
+    )
+
+
+def test_store_index_and_lineage(tmp_path, store):
+    store.append_all(
+        [
+            event(ProvenanceEventType.RECEIVE, "a", timestamp=1.0, transit_uri="x"),
+            event(ProvenanceEventType.FORK, "a", children=("b", "c"), timestamp=2.0),
+            event(ProvenanceEventType.ATTRIBUTES_MODIFIED, "d", ("c",), timestamp=3.0),
+            event(ProvenanceEventType.SEND, "e", timestamp=4.0),
+        ]
+    )
+
+    assert [e.event_type for e in store.get_events("a")] == [
+        ProvenanceEventType.RECEIVE,
+        ProvenanceEventType.FORK,
+    ]
+    assert store.get_events("a")[0].details == {"transit_uri": "x"}
+    assert store.get_events("b")[0].child_uuids == ("b", "c")
+    assert [e.timestamp for e in store.lineage("d")] == [1.0, 2.0, 3.0]
+    assert store.get_events("unknown") == []
+    assert len(list(store)) == 4
+
+    store.close()
+    reopened = ProvenanceEventStore(store.directory)
+    reopened.append_all([event(ProvenanceEventType.DROP, "d", timestamp=5.0)])
+    assert [e.timestamp for e in reopened.lineage("b")] == [1.0, 2.0, 3.0, 5.0]
+    reopened.close()
+
+
+def test_store_segments(tmp_path):
+    store = ProvenanceEventStore(str(tmp_path), segment_size=1)
+    for i in range(3):
+        store.append_all([event(ProvenanceEventType.SEND, "a", timestamp=float(i))])
+    assert len(store._segments()) == 3
+    assert [e.timestamp for e in store.get_events("a")] == [0.0, 1.0, 2.0]
+    store.close()
+
+
+def test_store_expire(tmp_path):
+    store = ProvenanceEventStore(str(tmp_path), segment_size=1, max_segments=2)
+    for i in range(4):
+        store.append_all([event(ProvenanceEventType.SEND, str(i), timestamp=i)])
+    assert store._segments() == [3, 4]
+    assert sorted(os.listdir(str(tmp_path))) == [
+        "000000000003.ff3",
+        "000000000003.idx",
+        "000000000004.ff3",
+        "000000000004.idx",
+    ]
+    assert "1" not in store and "2" in store and len(store) == 2
+    assert [e.timestamp for e in store] == [2.0, 3.0]
+    store.close()
+
+    # Reopening starts a new segment, the oldest is expired again
+    store = ProvenanceEventStore(str(tmp_path), max_segments=2)
+    assert store._segments() == [4, 5]
+    assert "2" not in store and "3" in store
+    assert store.expire(1) == [4]
+    assert len(store) == 0
+    store.close()
+
+
+def test_recorder_samples_whole_lineages(store):
+    recorder = ProvenanceRecorder(store, sample_rate=0.5, flush_interval=60)
+    roots = [str(i) for i in range(200)]
+    for root in roots:
+        recorder.record(ProvenanceEventType.RECEIVE, root)
+        recorder.record(ProvenanceEventType.FORK, root, children=(root + "-a",))
+        recorder.record(ProvenanceEventType.ATTRIBUTES_MODIFIED, root + "-b", (root,))
+        recorder.record(ProvenanceEventType.SEND, root + "-a")
+        recorder.record(ProvenanceEventType.DROP, root + "-b")
+    recorder.close()
+
+    sampled = [root for root in roots if root in store]
+    assert 50 < len(sampled) < 150
+    for root in sampled:
+        assert len(store.lineage(root)) == 5
+    for root in set(roots) - set(sampled):
+        assert root + "-a" not in store and root + "-b" not in store
+
+    # The same lineages on every run
+    other = ProvenanceRecorder(store, sample_rate=0.5)
+    assert [r for r in roots if other._sampled(r, (), ())] == sampled
+    other.close()
+
+
+def test_recorder_sampling_and_limits(store):
+    recorder = ProvenanceRecorder(store, sample_rate=0.0)
+    recorder.record(ProvenanceEventType.SEND, "a")
+    recorder.close()
+    assert "a" not in store
+
+    recorder = ProvenanceRecorder(store, event_types={ProvenanceEventType.DROP})
+    recorder.record(ProvenanceEventType.SEND, "b")
+    recorder.record(ProvenanceEventType.DROP, "c")
+    recorder.close()
+    assert "b" not in store and "c" in store
+
+    recorder = ProvenanceRecorder(store, max_buffer=2, flush_interval=60)
+    for uuid in "def":
+        recorder.record(ProvenanceEventType.SEND, uuid)
+    recorder.close()
+    assert recorder.dropped == 1
+    assert "d" in store and "e" in store and "f" not in store
+
+    with pytest.raises(ValueError):
+        ProvenanceRecorder(store, sample_rate=2)
+
+
+def test_flowfile_mutations(store, recorder):
+    flowfile = FlowFile({"uuid": "a"})
+    derived = flowfile.put_attribute("key", "value")
+    recorder.flush()
+
+    (modified,) = store.get_events("a")
+    assert modified.event_type == ProvenanceEventType.ATTRIBUTES_MODIFIED
+    assert modified.parent_uuids == ("a",)
+    assert modified.uuid == provenance.flowfile_uuid(derived) != "a"
+
+
+def test_dedup_drop(store, recorder):
+    writer = FlowFileStreamWriter(io.BytesIO(), dedup=ContentDigestIndex())
+    writer.write(FlowFile({"uuid": "a"}, b"same"))
+    writer.write(FlowFile({"uuid": "b"}, b"same"))
+    recorder.flush()
+
+    assert "a" not in store
+    (drop,) = store.get_events("b")
+    assert drop.event_type == ProvenanceEventType.DROP
+    assert drop.details == {"reason": "duplicate content"}
+
+
+def test_sqs_events(store, recorder, queue):
+    @queue.processor("in")
+    def split(flowfile):
+        return [FlowFile({"uuid": flowfile["uuid"] + str(i)}) for i in range(2)]
+
+    queue.connect_processor(lambda ff: None, "in/success")
+    queue.add_flowfile("in", FlowFile({"uuid": "a"}), response_port_prefix="in")
+    queue.process_batch()
+    recorder.flush()
+
+    assert [(e.event_type, e.child_uuids) for e in store.get_events("a")] == [
+        (ProvenanceEventType.SEND, ()),
+        (ProvenanceEventType.RECEIVE, ()),
+        (ProvenanceEventType.FORK, ("a0", "a1")),
+    ]
+    assert store.get_events("a")[0].details == {"transit_uri": "nifi+sqs://test/in"}
+    assert {e.event_type for e in store.get_events("a1")} == {
+        ProvenanceEventType.FORK,
+        ProvenanceEventType.SEND,
+    }
@@ -0,0 +1,85 @@
+"""Tests for `nifi.flowfile.repository` module."""
+import gc
+import os
+from io import BytesIO
+
+import pytest
+from nifi.flowfile import FlowFile
+from nifi.flowfile.repository import ContentClaim, ContentRepository, InMemoryContent
+from nifi.flowfile.stream import FlowFileStreamReader
+
+from ..helpers import encode
+
+
+@pytest.fixture
+def repository(tmp_path):
+    with ContentRepository(tmp_path / "content", threshold=4, segment_size=8) as repo:
+        yield repo
+
+
+def test_spill_above_threshold(repository):
+    flowfiles = [FlowFile(dict(a="1"), b"abc"), FlowFile(dict(b="2"), b"Hello World!")]
+
+    with BytesIO(encode(flowfiles)) as bytes_in:
+        small, large = FlowFileStreamReader(bytes_in, content_repository=repository)
+
+    assert small.get_content() == b"abc"
+    assert isinstance(large._content, ContentClaim)
+    assert large.get_content_size() == 12
+    assert large.get_content() == b"Hello World!"
+    assert encode([small, large]) == encode(flowfiles)
+
+
+def test_spill_above_memory_budget(repository):
+    repository.threshold = 1024
+    repository.memory_budget = 4
+    flowfiles = [FlowFile(dict(a="1"), b"abc"), FlowFile(dict(b="2"), b"def")]
+
+    with BytesIO(encode(flowfiles)) as bytes_in:
+        first, second = FlowFileStreamReader(bytes_in, content_repository=repository)
+
+    assert isinstance(first._content, InMemoryContent)
+    assert isinstance(second._content, ContentClaim)
+    assert repository.memory_usage == 3
+
+    # Derived FlowFiles share the content, it is accounted until all of them are gone
+    derived = first.put_attribute("c", "3")
+    del first
+    gc.collect()
+    assert repository.memory_usage == 3
+    assert derived.get_content() == b"abc"
+    # Finalizers may run while a segment is appended to on the same thread
+    with repository._lock:
+        del derived
+        gc.collect()
+    assert repository.memory_usage == 0
+
+
+def test_segments_removed_when_released(repository):
+    claims = [repository.claim(b"0123456789") for _ in range(3)]
+    directory = repository.directory
+    assert len(os.listdir(directory)) == 3
+
+    derived = FlowFile(dict(), claims[0]).put_attribute("a", "1")
+    del claims
+    gc.collect()
+    assert len(os.listdir(directory)) == 2
+    assert derived.get_content() == b"0123456789"
+
+
+def test_temporary_directory_outlives_claims():
+    repository = ContentRepository(threshold=0)
+    directory = repository.directory
+    with BytesIO(encode([FlowFile(dict(), b"abc")])) as bytes_in:
+        (flowfile,) = FlowFileStreamReader(bytes_in, content_repository=repository)
+
+    repository.close()
+    assert flowfile.get_content() == b"abc"
+    del flowfile
+    gc.collect()
+    assert not os.path.exists(directory)
+
+    repository = ContentRepository()
+    directory = repository.directory
+    repository.close()
+    assert not os.path.exists(directory)
@@ -0,0 +1,106 @@
+"""Tests for `nifi.flowfile.routing` module."""
+import random
+
+import pytest
+from nifi.flowfile import FlowFile
+from nifi.flowfile.routing import Compare, Equals, Prefix, Regex, RoutingTable
+
+
+@pytest.fixture
+def table():
+    table = RoutingTable()
+    table.add("json", Equals("mime.type", "application/json"))
+    table.add("logs", Prefix("filename", "log-"))
+    table.add("big-logs", Prefix("filename", "log-"), Compare("size", ">", 1000))
+    table.add("csv", Regex("filename", r".*\.csv"))
+    table.add("small", Compare("size", "<=", 10))
+    table.add("not-ten", Compare("size", "!=", 10))
+    return table
+
+
+def test_route(table):
+    def route(**attributes):
+        return table.route(FlowFile(attributes))
+
+    assert route(**{"mime.type": "application/json"}) == ["json"]
+    assert route(filename="log-1.csv", size="2000") == [
+        "logs",
+        "big-logs",
+        "csv",
+        "not-ten",
+    ]
+    assert route(filename="log-1", size="10") == ["logs", "small"]
+    assert route(filename="a.csv.gz", size="abc") == []
+    assert route() == []
+
+
+def test_compare_boundaries():
+    table = RoutingTable()
+    for op in ["<", "<=", ">", ">=", "=="]:
+        table.add(op, Compare("n", op, 5))
+
+    assert table.route({"n": "4"}) == ["<", "<="]
+    assert table.route({"n": "5"}) == ["<=", ">=", "=="]
+    assert table.route({"n": "5.5"}) == [">", ">="]
+
+
+def test_regex_back_references():
+    table = RoutingTable()
+    table.add("pair", Regex("k", r"(a)(b)"))
+    table.add("repeat", Regex("k", r"(x)\1"))
+    assert table.route({"k": "xx"}) == ["repeat"]
+    assert table.route({"k": "ab"}) == ["pair"]
+
+
+def test_no_predicates_always_match(table):
+    table.add("all")
+    assert table.route({}) == ["all"]
+
+
+def test_matches_brute_force():
+    rnd = random.Random(42)
+    keys, values = ["a", "b", "c"], ["x", "xy", "xyz", "1", "12", "3.5"]
+    predicates = [
+        lambda: Equals(rnd.choice(keys), rnd.choice(values)),
+        lambda: Prefix(rnd.choice(keys), rnd.choice(values)[:2]),
+        lambda: Regex(rnd.choice(keys), rnd.choice(["x.*", r"\d+", "y|1"])),
+        lambda: Compare(
+            rnd.choice(keys), rnd.choice(["<", "<=", ">", ">=", "==", "!="]), 2
+        ),
+    ]
+    table = RoutingTable()
+    for i in range(500):
+        table.add(i, *[rnd.choice(predicates)() for _ in range(rnd.randint(0, 3))])
+
+    for _ in range(200):
+        attributes = {k: rnd.choice(values) for k in keys if rnd.random() < 0.8}
+        expected = [rule.target for rule in table.rules if rule(attributes)]
+        assert table.route(attributes) == expected
+
+
+def test_queue_routes(queue):
+    received = []
+
+    @queue.route("in", Equals("mime.type", "text/csv"))
+    def csv(flowfile):
+        received.append(("csv", flowfile.get_attribute("filename")))
+
+    @queue.route("in", Prefix("filename", "a"))
+    def a(flowfile):
+        received.append(("a", flowfile.get_attribute("filename")))
+
+    queue.connect_processor(
+        lambda ff: received.append(("unmatched", ff.get_attribute("filename"))),
+        "in/unmatched",
+    )
+    queue.connect_processor(lambda ff: None, "in/success")
+    with pytest.raises(ValueError):
+        queue.connect_route(csv, "in/unmatched")
+
+    for filename, mime_type in [("a.csv", "text/csv"), ("b", "text/plain")]:
+        ff = FlowFile({"filename": filename, "mime.type": mime_type})
+        queue.add_flowfile("in", ff, response_port_prefix="in")
+    queue.process_batch()
+    queue.process_batch()
+
+    assert sorted(received) == [("a", "a.csv"), ("csv", "a.csv"), ("unmatched", "b")]
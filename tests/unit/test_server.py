@@ -0,0 +1,232 @@
+"""Tests for `nifi.flowfile.server` module."""
+import gzip
+import http.client
+import os
+import socket
+
+import pytest
+from nifi.flowfile import FlowFile
+from nifi.flowfile.repository import ContentClaim, ContentRepository, InMemoryContent
+from nifi.flowfile.server import FLOWFILE_V3_CONTENT_TYPE, ListenHTTPServer
+from nifi.flowfile.stream import FlowFileStreamDecoder
+
+from ..helpers import encode
+
+
+@pytest.fixture
+def flowfiles():
+    return [
+        FlowFile(dict(filename="a", path="./"), b"abc"),
+        FlowFile(dict(filename="b", path="./", x="y" * 70000), b""),
+        FlowFile(dict(filename="c", path="./"), b"Hello World!" * 1000),
+    ]
+
+
+@pytest.fixture
+def received():
+    return []
+
+
+@pytest.fixture
+def server(received):
+    async def handler(flowfile):
+        received.append(flowfile)
+
+    server = ListenHTTPServer(handler, host="127.0.0.1", port=0).start_in_thread()
+    yield server
+    server.stop_thread()
+
+
+@pytest.fixture
+def connection(server):
+    connection = http.client.HTTPConnection("127.0.0.1", server.port)
+    yield connection
+    connection.close()
+
+
+def post(connection, body, headers):
+    connection.request("POST", "/contentListener", body=body, headers=headers)
+    response = connection.getresponse()
+    response.read()
+    return response
+
+
+def test_decoder_byte_by_byte(flowfiles):
+    data = encode(flowfiles)
+    decoder = FlowFileStreamDecoder()
+
+    decoded = []
+    for i in range(len(data)):
+        decoded += decoder.feed(data[i:][:1])
+    decoder.close()
+
+    assert [ff.get_attributes() for ff in decoded] == [
+        ff.get_attributes() for ff in flowfiles
+    ]
+    assert [ff.get_content() for ff in decoded] == [
+        ff.get_content() for ff in flowfiles
+    ]
+
+
+def test_decoder_partial_record(flowfiles):
+    decoder = FlowFileStreamDecoder()
+    assert len(decoder.feed(encode(flowfiles)[:-1])) == 2
+    with pytest.raises(IOError):
+        decoder.close()
+
+
+def test_decoder_spills_to_repository(flowfiles, tmp_path):
+    repository = ContentRepository(str(tmp_path), threshold=100)
+    data = encode(flowfiles)
+    decoder = FlowFileStreamDecoder(content_repository=repository)
+
+    decoded = []
+    for i in range(0, len(data), 1000):
+        decoded += decoder.feed(data[i:][:1000])
+    decoder.close()
+
+    assert isinstance(decoded[0]._content, InMemoryContent)
+    assert isinstance(decoded[2]._content, ContentClaim)
+    assert decoded[2].get_content() == flowfiles[2].get_content()
+    assert repository.memory_usage == 3
+
+    # A partial record is dropped from the repository
+    decoded = None
+    decoder.feed(data[:-1])
+    with pytest.raises(IOError):
+        decoder.close()
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_decoder_limits(flowfiles):
+    with pytest.raises(ValueError):
+        FlowFileStreamDecoder(max_content_size=100).feed(encode(flowfiles))
+    with pytest.raises(ValueError):
+        FlowFileStreamDecoder(max_attributes_size=1024).feed(encode(flowfiles))
+
+
+def test_head_advertises_flowfile_v3(connection):
+    connection.request("HEAD", "/contentListener")
+    response = connection.getresponse()
+    response.read()
+    assert response.status == 200
+    assert response.getheader("Accept") == FLOWFILE_V3_CONTENT_TYPE
+
+
+def test_keep_alive(connection, received, flowfiles):
+    headers = {"Content-Type": FLOWFILE_V3_CONTENT_TYPE}
+    for _ in range(3):
+        assert post(connection, encode(flowfiles), headers).status == 200
+
+    assert len(received) == 9
+    assert received[2].get_content() == flowfiles[2].get_content()
+    assert received[1].get_attribute("x") == "y" * 70000
+
+
+def test_chunked_gzip(connection, received, flowfiles):
+    headers = {"Content-Type": FLOWFILE_V3_CONTENT_TYPE, "Content-Encoding": "gzip"}
+    data = gzip.compress(encode(flowfiles))
+    chunks = (data[i:][:100] for i in range(0, len(data), 100))
+
+    assert post(connection, chunks, headers).status == 200
+    assert [ff.get_attribute("filename") for ff in received] == ["a", "b", "c"]
+    assert received[2].get_content() == flowfiles[2].get_content()
+
+
+def test_large_content_is_not_buffered(received, flowfiles, tmp_path):
+    async def handler(flowfile):
+        received.append(flowfile)
+
+    repository = ContentRepository(str(tmp_path), threshold=100)
+    server = ListenHTTPServer(
+        handler, host="127.0.0.1", port=0, read_size=1000, content_repository=repository
+    ).start_in_thread()
+    try:
+        connection = http.client.HTTPConnection("127.0.0.1", server.port)
+        headers = {"Content-Type": FLOWFILE_V3_CONTENT_TYPE}
+        assert post(connection, encode(flowfiles), headers).status == 200
+        content = b"x" * 5000
+        assert post(connection, content, {"Content-Type": "text/plain"}).status == 200
+        connection.close()
+    finally:
+        server.stop_thread()
+
+    assert isinstance(received[2]._content, ContentClaim)
+    assert received[2].get_content() == flowfiles[2].get_content()
+    assert isinstance(received[3]._content, ContentClaim)
+    assert received[3].get_content() == content
+
+
+def test_plain_content(connection, received):
+    response = post(connection, b"Hello World!", {"Content-Type": "text/plain"})
+
+    assert response.status == 200
+    (flowfile,) = received
+    assert flowfile.get_content() == b"Hello World!"
+    assert flowfile.get_attribute("mime.type") == "text/plain"
+    assert flowfile.get_attribute("uuid") == flowfile.get_attribute("filename")
+
+
+def test_errors(server, received, flowfiles):
+    def request(method, path, body=None, headers={}):
+        connection = http.client.HTTPConnection("127.0.0.1", server.port)
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            return connection.getresponse().status
+        finally:
+            connection.close()
+
+    assert request("POST", "/other", b"") == 404
+    assert request("PUT", "/contentListener", b"") == 405
+
+    server.max_content_size = 100
+    headers = {"Content-Type": FLOWFILE_V3_CONTENT_TYPE}
+    assert request("POST", "/contentListener", encode(flowfiles), headers) == 413
+
+    assert request("POST", "/contentListener", b"NiFiFF2", headers) == 400
+
+
+def test_truncated_body(server, received):
+    with socket.create_connection(("127.0.0.1", server.port)) as s:
+        s.sendall(b"POST /contentListener HTTP/1.1\r\nContent-Length: 100\r\n\r\nabc")
+        s.shutdown(socket.SHUT_WR)
+        assert s.recv(1024) == b""
+    assert received == []
+
+
+def test_malformed_requests(server, received, flowfiles):
+    with socket.create_connection(("127.0.0.1", server.port)) as s:
+        s.sendall(b"GARBAGE\r\n\r\n")
+        assert s.recv(1024).startswith(b"HTTP/1.1 400 ")
+
+    # The attribute key "é" encoded as latin-1, which is not valid UTF-8
+    data = encode([FlowFile({"k": "v"}, b"")]).replace(b"\x00\x01k", b"\x00\x01\xe9")
+    head = "POST /contentListener HTTP/1.1\r\nContent-Type: {}\r\n"
+    head += "Content-Length: {}\r\n\r\n"
+    head = head.format(FLOWFILE_V3_CONTENT_TYPE, len(data)).encode("latin-1")
+    with socket.create_connection(("127.0.0.1", server.port)) as s:
+        s.sendall(head + data)
+        assert s.recv(1024).startswith(b"HTTP/1.1 400 ")
+    assert received == []
+
+
+def test_chunk_line_too_long(server, received):
+    with socket.create_connection(("127.0.0.1", server.port)) as s:
+        head = b"POST /contentListener HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n"
+        s.sendall(head + b"1" * 100000)
+        assert s.recv(1024).startswith(b"HTTP/1.1 400 ")
+    assert received == []
+
+
+def test_handler_errors_are_server_errors(flowfiles):
+    def handler(flowfile):
+        raise ValueError("handler bug")
+
+    server = ListenHTTPServer(handler, host="127.0.0.1", port=0).start_in_thread()
+    try:
+        connection = http.client.HTTPConnection("127.0.0.1", server.port)
+        headers = {"Content-Type": FLOWFILE_V3_CONTENT_TYPE}
+        assert post(connection, encode(flowfiles), headers).status == 500
+        connection.close()
+    finally:
+        server.stop_thread()
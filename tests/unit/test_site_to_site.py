@@ -0,0 +1,138 @@
+"""Tests for `nifi.site_to_site` package."""
+from io import BytesIO
+
+import pytest
+from nifi.flowfile import FlowFile
+from nifi.site_to_site import Peer, SiteToSiteClient, SiteToSiteError
+from nifi.site_to_site.protocol import read_packet, read_utf, write_packet, write_utf
+from nifi.site_to_site.server import SiteToSiteServer
+
+PORT_ID = "e2f5e6f8-0171-1000-0000-000000000000"
+
+
+@pytest.fixture
+def received():
+    return []
+
+
+@pytest.fixture
+def server(received):
+    def handler(port_id, flowfiles):
+        received.extend((port_id, ff) for ff in flowfiles)
+
+    with SiteToSiteServer(handler, ports={PORT_ID}) as server:
+        yield server
+
+
+@pytest.fixture
+def client(server):
+    with SiteToSiteClient([server.peer], PORT_ID, batch_count=3) as client:
+        yield client
+
+
+def test_utf_round_trip():
+    for value in ["", "abc", "a\x00b", "café", "\U0001f600"]:
+        with BytesIO() as f:
+            write_utf(f, value)
+            f.seek(0)
+            assert read_utf(f) == value
+
+    with BytesIO() as f:
+        write_utf(f, "\x00\U0001f600")
+        assert f.getvalue() == b"\x00\x08\xc0\x80\xed\xa0\xbd\xed\xb8\x80"
+
+
+def test_packet_round_trip():
+    ff = FlowFile(dict(a="1", b="é"), b"Hello World!")
+    with BytesIO() as f:
+        crc = write_packet(f, ff)
+        f.seek(0)
+        assert read_packet(f) == ({"a": "1", "b": "é"}, b"Hello World!", crc)
+
+
+def test_send(client, server, received):
+    flowfiles = [FlowFile(dict(filename=str(i)), b"x" * i) for i in range(7)]
+
+    assert client.send(flowfiles) == 7
+    assert server.transaction_count == 3
+    assert server.connection_count == 1
+    assert [port_id for port_id, _ in received] == [PORT_ID] * 7
+    assert [ff.get_attribute("filename") for _, ff in received] == [
+        str(i) for i in range(7)
+    ]
+    assert received[6][1].get_content() == b"xxxxxx"
+
+
+def test_round_robin(received):
+    def handler(port_id, flowfiles):
+        received.extend(flowfiles)
+
+    with SiteToSiteServer(handler) as a, SiteToSiteServer(handler) as b:
+        a.peers = b.peers = [a.peer, b.peer]
+        with SiteToSiteClient([a.peer], PORT_ID, batch_count=1) as client:
+            assert client.send(FlowFile(dict(), b"") for _ in range(4)) == 4
+            assert client.peers == [a.peer, b.peer]
+
+    assert a.transaction_count == b.transaction_count == 2
+    assert a.connection_count == b.connection_count == 1
+
+
+def test_failover(server, received):
+    with SiteToSiteServer(None) as down:
+        dead_peer = down.peer
+    with SiteToSiteClient(
+        [dead_peer, server.peer], PORT_ID, peer_refresh_interval=None
+    ) as client:
+        assert client.send_transaction([FlowFile(dict(), b"")]) == server.peer
+        assert client.send_transaction([FlowFile(dict(), b"")]) == server.peer
+    assert len(received) == 2
+
+
+def test_destination_full(server):
+    server.destination_full = True
+    with SiteToSiteClient([server.peer], PORT_ID, peer_refresh_interval=None) as c:
+        c.send([FlowFile(dict(), b"")])
+        assert c._penalized[server.peer.address] > 0
+
+
+def test_refresh_peers_with_changing_counts(server):
+    with SiteToSiteServer(None) as down:
+        dead_peer = down.peer
+    with SiteToSiteClient([server.peer], PORT_ID) as client:
+        for count in range(3):
+            server.peers = [server.peer._replace(flowfile_count=count), dead_peer]
+            client.penalize(dead_peer._replace(flowfile_count=count))
+            client.refresh_peers()
+            client.send([FlowFile(dict(), b"")])
+        assert list(client.pool._idle) == [server.peer.address]
+        assert list(client._penalized) == [dead_peer.address]
+
+        # Peers dropping out of the list lose their idle connections and penalties
+        server.peers = [Peer("localhost", server.peer.port + 1)]
+        client.refresh_peers()
+        assert client.pool._idle == {}
+        assert client._penalized == {}
+    assert server.connection_count == 1
+
+
+def test_unknown_port(server):
+    with SiteToSiteClient([server.peer], "unknown", peer_refresh_interval=None) as c:
+        with pytest.raises(SiteToSiteError, match="UNKNOWN_PORT"):
+            c.send([FlowFile(dict(), b"")])
+
+
+def test_protocol_version_negotiation(received):
+    def handler(port_id, flowfiles):
+        received.extend(flowfiles)
+
+    with SiteToSiteServer(handler, protocol_versions=(4, 1)) as server:
+        with SiteToSiteClient([server.peer], PORT_ID) as client:
+            client.send([FlowFile(dict(a="1"), b"abc")])
+            (connection,) = client.pool._idle[server.peer.address]
+            assert connection.protocol_version == 4
+    assert received[0].get_content() == b"abc"
+
+
+def test_peer_parse():
+    assert Peer.parse("nifi-0:10000") == Peer("nifi-0", 10000, False, 0)
+    assert Peer.parse("nifi-0:10000").url == "nifi://nifi-0:10000"
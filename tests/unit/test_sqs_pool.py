@@ -0,0 +1,184 @@
+"""Tests for `nifi.sqs_workers.pool` and `nifi.sqs_workers.consumer` modules."""
+import threading
+import time
+
+import pytest
+from nifi.flowfile import FlowFile
+
+from ..helpers import make_queue
+
+sqs_workers = pytest.importorskip("sqs_workers")
+
+
+@pytest.fixture
+def env(sqs_env):
+    for name in ("a", "b", "c"):
+        make_queue(sqs_env, name)
+    return sqs_env
+
+
+def test_client_pool_is_shared(env):
+    from nifi.sqs_workers import NiFiQueue
+    from nifi.sqs_workers.pool import get_client_pool
+
+    pool = get_client_pool(env)
+    assert get_client_pool(env) is pool
+    assert env.queue("a", NiFiQueue).get_queue() is pool.get_queue("a")
+
+
+class RecordingResource(object):
+    def __init__(self):
+        self.lookups = []
+
+    def get_queue_by_name(self, QueueName):
+        self.lookups.append((QueueName, object()))
+        return self.lookups[-1][1]
+
+
+def test_client_pool_ttl_and_invalidate(env, monkeypatch):
+    from nifi.sqs_workers import ClientPool
+
+    pool = ClientPool(env, ttl=60)
+    monkeypatch.setattr(pool, "_create_resource", RecordingResource)
+    queue = pool.get_queue("a")
+    assert pool.get_queue("a") is queue
+    assert [name for name, _ in pool.resource.lookups] == ["a"]
+
+    pool.invalidate("a")
+    assert pool.get_queue("a") is not queue
+
+    queue = pool.get_queue("a")
+    pool.invalidate()
+    assert pool.get_queue("a") is not queue
+
+    pool.ttl = 0
+    pool.invalidate()
+    queue = pool.get_queue("a")
+    assert pool.get_queue("a") is not queue
+    assert len(pool.resource.lookups) == 5
+
+
+def test_client_pool_thread_local(env, monkeypatch):
+    from nifi.sqs_workers import ClientPool
+
+    pool = ClientPool(env)
+    monkeypatch.setattr(pool, "_create_resource", RecordingResource)
+    resources = [pool.resource]
+    thread = threading.Thread(target=lambda: resources.append(pool.resource))
+    thread.start()
+    thread.join()
+
+    assert pool.resource is resources[0]
+    assert resources[1] is not resources[0]
+
+
+def test_client_pool_keeps_resource_endpoint():
+    import boto3
+    from nifi.sqs_workers import ClientPool
+
+    session = boto3.Session(
+        region_name="us-east-1", aws_access_key_id="x", aws_secret_access_key="x"
+    )
+    env = sqs_workers.SQSEnv(
+        session,
+        sqs_resource=session.resource(
+            "sqs", region_name="eu-west-1", endpoint_url="http://localhost:4566"
+        ),
+    )
+    resources = []
+    pool = ClientPool(env)
+    thread = threading.Thread(target=lambda: resources.append(pool.resource))
+    thread.start()
+    thread.join()
+
+    (resource,) = resources
+    assert resource is not env.sqs_resource
+    assert resource.meta.client.meta.region_name == "eu-west-1"
+    assert resource.meta.client.meta.endpoint_url == "http://localhost:4566"
+
+    # Resources created by the environment keep its retry configuration
+    env = sqs_workers.SQSEnv(session, retry_max_attempts=7)
+    retries = ClientPool(env).resource.meta.client.meta.config.retries
+    assert retries["total_max_attempts"] == 8
+
+
+def test_send_through_pool(env):
+    from nifi.sqs_workers import NiFiQueue
+
+    queue = env.queue("a", NiFiQueue)
+    received = []
+    queue.connect_processor(received.append, "in")
+    queue.add_flowfile("in", FlowFile({"filename": "x"}))
+    queue.process_batch()
+
+    assert [ff.get_attribute("filename") for ff in received] == ["x"]
+
+
+def test_multi_queue_consumer_fairness(env):
+    from nifi.sqs_workers import MultiQueueConsumer, NiFiQueue
+
+    queues = [env.queue(name, NiFiQueue) for name in ("a", "b", "c")]
+    order = []
+    for queue in queues:
+        queue.connect_processor(lambda ff, name=queue.name: order.append(name), "in")
+    # "a" is much busier than the others, it must not delay them
+    for i in range(30):
+        queues[0].add_flowfile("in", FlowFile({"i": str(i)}))
+    for queue in queues[1:]:
+        queue.add_flowfile("in", FlowFile({"i": "0"}))
+
+    consumer = MultiQueueConsumer(queues, workers=1, idle_backoff=0.01)
+    consumer.start()
+    deadline = time.monotonic() + 5
+    while sum(consumer.processed.values()) < 32 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    consumer.stop()
+
+    assert consumer.processed == {"a": 30, "b": 1, "c": 1}
+    assert {"b", "c"} <= set(order[:12])
+
+
+def test_multi_queue_consumer_idle_backoff(env):
+    from nifi.sqs_workers import MultiQueueConsumer, NiFiQueue
+
+    queue = env.queue("a", NiFiQueue)
+    consumer = MultiQueueConsumer([queue], idle_backoff=1, max_idle_backoff=4)
+
+    backoffs = []
+    backoff = 0.0
+    for _ in range(4):
+        consumer.process_turn(queue, backoff)
+        ready_at, _, _, backoff = consumer._ready.pop()
+        backoffs.append(backoff)
+    assert backoffs == [1, 2, 4, 4]
+
+    queue.connect_processor(lambda ff: None, "in")
+    queue.add_flowfile("in", FlowFile({}))
+    assert consumer.process_turn(queue, backoff) == 1
+    assert consumer._ready.pop()[3] == 0.0
+
+
+def test_multi_queue_consumer_serves_idle_queue_during_backlog(env):
+    from nifi.sqs_workers import MultiQueueConsumer, NiFiQueue
+
+    busy, idle = env.queue("a", NiFiQueue), env.queue("b", NiFiQueue)
+    for queue in (busy, idle):
+        queue.connect_processor(lambda ff: None, "in")
+    consumer = MultiQueueConsumer([busy, idle], idle_backoff=0.05)
+    consumer._ready = []
+
+    # "b" is backing off when a message arrives, "a" still has a backlog
+    assert consumer.process_turn(idle) == 0
+    for i in range(30):
+        busy.add_flowfile("in", FlowFile({"i": str(i)}))
+    assert consumer.process_turn(busy) > 0
+    idle.add_flowfile("in", FlowFile({}))
+    time.sleep(0.06)
+
+    order = []
+    while not consumer.processed["b"] and len(order) < 10:
+        queue, backoff = consumer._take()
+        order.append(queue.name)
+        consumer.process_turn(queue, backoff)
+    assert order == ["a", "b"]
+    assert consumer.processed["a"] < 30